@@ -0,0 +1,428 @@
+"""
+Alert Rules Engine
+Compiles threshold rules ("curPrice crosses 0.9", "percentPnl < -30%",
+"currentValue > $10k") into sorted threshold indexes evaluated over the
+combined positions frame of many wallets in one pass
+"""
+import json
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = ".polymarket_cache/alerts.sqlite"
+
+# Keyed tables so each evaluation only writes what changed; `values` holds one
+# row per (position, field) since the set of watched fields follows the rules
+STATE_SCHEMA = """
+DROP TABLE IF EXISTS active;
+DROP TABLE IF EXISTS last_fired;
+DROP TABLE IF EXISTS last_values;
+CREATE TABLE IF NOT EXISTS alert_active (
+    key TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alert_last_fired (
+    key TEXT PRIMARY KEY,
+    fired_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alert_values (
+    key TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (key, field)
+) WITHOUT ROWID;
+"""
+
+LEVEL_OPS = (">", ">=", "<", "<=")
+CROSS_OPS = ("crosses_above", "crosses_below", "crosses")
+
+RULE_RE = re.compile(
+    r"^\s*(?P<field>\w+)\s+"
+    r"(?P<op>crosses(?:[ _](?:above|below))?|>=|<=|>|<)\s*"
+    r"(?P<threshold>[-+]?\$?[\d,]*\.?\d+\s*[kKmM]?%?)\s*$"
+)
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """One threshold rule, optionally limited to a single wallet"""
+    rule_id: str
+    field: str
+    op: str
+    threshold: float
+    wallet: Optional[str] = None
+    cooldown: float = 0.0   # seconds before a crossing rule may fire again for the same position
+
+    def describe(self) -> str:
+        return f"{self.field} {self.op.replace('_', ' ')} {self.threshold:g}"
+
+
+def _parse_threshold(text: str) -> float:
+    # "$10k" -> 10000, "-30%" -> -30 (percentPnl is already in percent), "1,500" -> 1500
+    text = text.replace("$", "").replace(",", "").replace("%", "").strip()
+    scale = {"k": 1e3, "m": 1e6}.get(text[-1:].lower(), 1.0)
+    if scale != 1.0:
+        text = text[:-1]
+    return float(text) * scale
+
+
+def parse_rule(text: str, rule_id: Optional[str] = None, wallet: Optional[str] = None, cooldown: float = 0.0) -> AlertRule:
+    """Parse `<field> <op> <threshold>`; raises ValueError for anything else"""
+    match = RULE_RE.match(text)
+    if not match:
+        raise ValueError(f"Cannot parse alert rule: {text!r}")
+    op = match.group("op").replace(" ", "_")
+    return AlertRule(
+        rule_id=rule_id or text.strip(),
+        field=match.group("field"),
+        op=op,
+        threshold=_parse_threshold(match.group("threshold")),
+        wallet=wallet.lower() if wallet else None,
+        cooldown=cooldown
+    )
+
+
+def load_rules(source: Optional[str] = None) -> List[AlertRule]:
+    """
+    Load rules from ALERT_RULES: a path to a JSON list of
+    {"id", "rule", "wallet", "cooldown"} objects, or rules separated by ';'
+    """
+    source = source if source is not None else os.getenv('ALERT_RULES', '')
+    if not source.strip():
+        return []
+    if source.strip().endswith(".json") and Path(source.strip()).exists():
+        items = json.loads(Path(source.strip()).read_text(encoding="utf-8"))
+        return [
+            parse_rule(item["rule"], item.get("id"), item.get("wallet"), float(item.get("cooldown", 0)))
+            for item in items
+        ]
+    return [parse_rule(text) for text in source.split(";") if text.strip()]
+
+
+def _expand_ranges(lo: np.ndarray, hi: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """All (row, k) pairs with lo[row] <= k < hi[row], without a Python loop"""
+    counts = np.clip(hi - lo, 0, None)
+    rows = np.repeat(np.arange(len(lo)), counts)
+    starts = np.cumsum(counts) - counts
+    ks = np.repeat(lo, counts) + (np.arange(counts.sum()) - np.repeat(starts, counts))
+    return rows, ks
+
+
+class _ThresholdIndex:
+    """Rules sharing a field and operator, sorted by threshold"""
+
+    def __init__(self, op: str, thresholds: np.ndarray, rule_idx: np.ndarray):
+        order = np.argsort(thresholds, kind="stable")
+        self.op = op
+        self.thresholds = thresholds[order]
+        self.rule_idx = rule_idx[order]
+
+    def match(self, current: np.ndarray, previous: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(row, rule) pairs for the rules each row triggers"""
+        t, n = self.thresholds, len(self.thresholds)
+        valid = ~np.isnan(current)
+        zeros = np.zeros(len(current), dtype=np.int64)
+        full = np.full(len(current), n, dtype=np.int64)
+
+        if self.op == ">":          # t < v
+            lo, hi = zeros, np.searchsorted(t, current, side="left")
+        elif self.op == ">=":       # t <= v
+            lo, hi = zeros, np.searchsorted(t, current, side="right")
+        elif self.op == "<":        # t > v
+            lo, hi = np.searchsorted(t, current, side="right"), full
+        elif self.op == "<=":       # t >= v
+            lo, hi = np.searchsorted(t, current, side="left"), full
+        else:
+            valid &= ~np.isnan(previous)
+            up_lo, up_hi = np.searchsorted(t, previous, side="right"), np.searchsorted(t, current, side="right")
+            down_lo, down_hi = np.searchsorted(t, current, side="right"), np.searchsorted(t, previous, side="right")
+            if self.op == "crosses_above":      # prev < t <= cur
+                lo, hi = up_lo, up_hi
+            elif self.op == "crosses_below":    # cur < t <= prev
+                lo, hi = down_lo, down_hi
+            else:                               # only one direction can be non-empty
+                lo = np.where(current >= previous, up_lo, down_lo)
+                hi = np.where(current >= previous, up_hi, down_hi)
+
+        hi = np.where(valid, hi, lo)
+        rows, ks = _expand_ranges(lo, hi)
+        return rows, self.rule_idx[ks]
+
+
+class AlertEngine:
+    """
+    Evaluates compiled rules over positions of many wallets
+
+    Level rules (>, <, ...) fire when their condition becomes true for a
+    position and stay quiet while it holds. Crossing rules compare with the
+    value seen on the previous evaluation and respect their cooldown. State is
+    kept in SQLite when `state_path` is given, so restarts do not re-fire.
+    """
+
+    def __init__(self, rules: Iterable[AlertRule], state_path: Optional[str] = None):
+        self.rules = list(rules)
+        self.state_path = Path(state_path) if state_path else None
+        self._rule_ids = np.array([r.rule_id for r in self.rules], dtype=object)
+        self._rule_wallets = np.array([r.wallet or "" for r in self.rules], dtype=object)
+        self._cooldowns = np.array([r.cooldown for r in self.rules], dtype=float)
+        self._is_level = np.array([r.op in LEVEL_OPS for r in self.rules], dtype=bool)
+        self._descriptions = np.array([r.describe() for r in self.rules], dtype=object)
+        self._fields = np.array([r.field for r in self.rules], dtype=object)
+
+        self._indexes: Dict[str, List[_ThresholdIndex]] = {}
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        for i, rule in enumerate(self.rules):
+            if rule.op not in LEVEL_OPS + CROSS_OPS:
+                raise ValueError(f"Unknown operator in rule {rule.rule_id}: {rule.op}")
+            groups.setdefault((rule.field, rule.op), []).append(i)
+        for (field, op), idx in groups.items():
+            idx = np.array(idx)
+            thresholds = np.array([self.rules[i].threshold for i in idx], dtype=float)
+            self._indexes.setdefault(field, []).append(_ThresholdIndex(op, thresholds, idx))
+
+        # Active level alerts, last fire time of crossing alerts, last seen values
+        self._active = pd.Index([], dtype=object)
+        self._last_fired = pd.Series(dtype=float)
+        self._last_values = pd.DataFrame(columns=list(self._indexes), dtype=float)
+        self._changes = _StateChanges()
+        self.load_state()
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self._indexes)
+
+    def evaluate(self, positions: pd.DataFrame, now: Optional[float] = None) -> pd.DataFrame:
+        """
+        Evaluate all rules over a combined positions frame with `wallet` and
+        `asset` columns
+
+        Returns:
+            One row per alert to send: rule, wallet, asset, title, outcome,
+            field, value and previous value
+        """
+        now = time.time() if now is None else now
+        if positions.empty or not self.rules:
+            return self._empty_alerts()
+
+        wallet_col = positions["wallet"].astype(str).str.lower()
+        keys = (wallet_col + "|" + positions["asset"].astype(str)).to_numpy()
+        frame_wallets = pd.unique(wallet_col)
+        previous_values = self._last_values.reindex(keys)
+
+        rows_all, rules_all, values_all, prev_all = [], [], [], []
+        for field, indexes in self._indexes.items():
+            if field not in positions.columns:
+                continue
+            current = pd.to_numeric(positions[field], errors="coerce").to_numpy(dtype=float)
+            previous = previous_values[field].to_numpy(dtype=float) if field in previous_values else np.full(len(current), np.nan)
+            for index in indexes:
+                rows, rule_idx = index.match(current, previous)
+                rows_all.append(rows)
+                rules_all.append(rule_idx)
+                values_all.append(current[rows])
+                prev_all.append(previous[rows])
+
+        self._remember_values(positions, keys, frame_wallets)
+        self._prune_closed(keys, frame_wallets)
+        if not rows_all:
+            self.save_state()
+            return self._empty_alerts()
+
+        rows = np.concatenate(rows_all)
+        rule_idx = np.concatenate(rules_all)
+        values = np.concatenate(values_all)
+        prev = np.concatenate(prev_all)
+
+        # Wallet-scoped rules only apply to their wallet
+        wallets = positions["wallet"].astype(str).str.lower().to_numpy()[rows]
+        rule_wallets = self._rule_wallets[rule_idx]
+        scoped = (rule_wallets == "") | (rule_wallets == wallets)
+        rows, rule_idx, values, prev, wallets = rows[scoped], rule_idx[scoped], values[scoped], prev[scoped], wallets[scoped]
+
+        alert_keys = pd.Index(self._rule_ids[rule_idx].astype(str)) + "|" + pd.Index(keys[rows].astype(str))
+        level = self._is_level[rule_idx]
+
+        # Level rules: fire on the transition into the condition only. Alerts
+        # of wallets not in this frame (other batches) stay active.
+        was_active = alert_keys.isin(self._active)
+        old_wallets = self._active.str.rsplit("|", n=2).str[-2]
+        kept = self._active[~old_wallets.isin(frame_wallets)]
+        now_active = alert_keys[level].unique()
+        self._changes.active_added.update(now_active.difference(self._active))
+        self._changes.active_removed.update(self._active.difference(kept.append(now_active)))
+        self._active = kept.append(now_active)
+
+        # Crossing rules: fire unless still cooling down
+        last = self._last_fired.reindex(alert_keys).to_numpy(dtype=float)
+        cooled = np.isnan(last) | (now - last >= self._cooldowns[rule_idx])
+
+        fire = np.where(level, ~was_active, cooled)
+        fired_keys = alert_keys[fire & ~level]
+        if len(fired_keys):
+            self._last_fired = pd.concat([
+                self._last_fired.drop(fired_keys, errors="ignore"),
+                pd.Series(now, index=fired_keys, dtype=float),
+            ])
+            self._changes.fired.update(fired_keys)
+        self.save_state()
+
+        rows, rule_idx = rows[fire], rule_idx[fire]
+        alerts = pd.DataFrame({
+            "rule_id": self._rule_ids[rule_idx],
+            "rule": self._descriptions[rule_idx],
+            "wallet": wallets[fire],
+            "asset": positions["asset"].to_numpy()[rows],
+            "title": positions["title"].to_numpy()[rows] if "title" in positions.columns else None,
+            "outcome": positions["outcome"].to_numpy()[rows] if "outcome" in positions.columns else None,
+            "field": self._fields[rule_idx],
+            "value": values[fire],
+            "previous": prev[fire],
+            "fired_at": now,
+        })
+        return alerts.sort_values(["wallet", "rule_id", "asset"], kind="stable").reset_index(drop=True)
+
+    def _remember_values(self, positions: pd.DataFrame, keys: np.ndarray, frame_wallets: np.ndarray) -> None:
+        fields = [f for f in self._indexes if f in positions.columns]
+        current = pd.DataFrame(
+            {f: pd.to_numeric(positions[f], errors="coerce").to_numpy(dtype=float) for f in fields},
+            index=pd.Index(keys, dtype=object)
+        )
+        current = current[~current.index.duplicated(keep="last")]
+
+        before = self._last_values.reindex(index=current.index, columns=current.columns)
+        same = ((before == current) | (before.isna() & current.isna())).all(axis=1)
+        changed = current[~same.to_numpy()]
+        for key, values in zip(changed.index, changed.itertuples(index=False)):
+            self._changes.values[key] = dict(zip(changed.columns, values))
+
+        # Positions of wallets absent from this frame keep their old values (other
+        # batches); closed positions of wallets in it are forgotten
+        old_wallets = self._last_values.index.astype(str).str.split("|", n=1).str[0]
+        stale = self._last_values.index[old_wallets.isin(frame_wallets) & ~self._last_values.index.isin(current.index)]
+        self._changes.values_removed.update(stale)
+        rest = self._last_values.drop(current.index.union(stale), errors="ignore")
+        self._last_values = pd.concat([rest, current]) if len(rest) else current
+
+    def _prune_closed(self, keys: np.ndarray, frame_wallets: np.ndarray) -> None:
+        """Forget cooldowns of closed positions of the wallets in this frame"""
+        if self._last_fired.empty:
+            return
+        parts = self._last_fired.index.astype(str).str.rsplit("|", n=2)
+        positions = parts.str[-2:].str.join("|")
+        stale = parts.str[-2].isin(frame_wallets) & ~positions.isin(keys)
+        if stale.any():
+            self._changes.fired_removed.update(self._last_fired.index[stale])
+            self._last_fired = self._last_fired[~stale]
+
+    @staticmethod
+    def _empty_alerts() -> pd.DataFrame:
+        return pd.DataFrame(columns=[
+            "rule_id", "rule", "wallet", "asset", "title", "outcome", "field", "value", "previous", "fired_at"
+        ])
+
+    # ---- persistence ----
+    def _connect(self) -> sqlite3.Connection:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.state_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(STATE_SCHEMA)
+        return conn
+
+    def load_state(self) -> None:
+        self._changes = _StateChanges()
+        if self.state_path is None or not self.state_path.exists():
+            return
+        try:
+            conn = self._connect()
+            try:
+                self._active = pd.Index(pd.read_sql_query("SELECT key FROM alert_active", conn)["key"], dtype=object)
+                fired = pd.read_sql_query("SELECT key, fired_at FROM alert_last_fired", conn)
+                self._last_fired = pd.Series(fired["fired_at"].to_numpy(dtype=float), index=pd.Index(fired["key"], dtype=object))
+                values = pd.read_sql_query("SELECT key, field, value FROM alert_values", conn)
+                values = values.pivot(index="key", columns="field", values="value")
+                self._last_values = values.rename_axis(index=None, columns=None).astype(float)
+            finally:
+                conn.close()
+        except (sqlite3.Error, KeyError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable alert state {self.state_path}: {str(e)}")
+
+    def save_state(self) -> None:
+        """Write the rows changed since the last save"""
+        changes, self._changes = self._changes, _StateChanges()
+        if self.state_path is None or changes.empty:
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany("DELETE FROM alert_active WHERE key = ?", [(k,) for k in changes.active_removed])
+                conn.executemany("INSERT OR IGNORE INTO alert_active (key) VALUES (?)", [(k,) for k in changes.active_added])
+                conn.executemany("DELETE FROM alert_last_fired WHERE key = ?", [(k,) for k in changes.fired_removed])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO alert_last_fired (key, fired_at) VALUES (?, ?)",
+                    [(k, float(self._last_fired[k])) for k in changes.fired if k in self._last_fired.index]
+                )
+                conn.executemany("DELETE FROM alert_values WHERE key = ?", [(k,) for k in changes.values_removed])
+                conn.executemany(
+                    "INSERT OR REPLACE INTO alert_values (key, field, value) VALUES (?, ?, ?)",
+                    [
+                        (key, name, None if pd.isna(value) else float(value))
+                        for key, values in changes.values.items()
+                        for name, value in values.items()
+                    ]
+                )
+        finally:
+            conn.close()
+
+
+@dataclass
+class _StateChanges:
+    """Alert state rows to write on the next `save_state`"""
+    active_added: set = field(default_factory=set)
+    active_removed: set = field(default_factory=set)
+    fired: set = field(default_factory=set)
+    fired_removed: set = field(default_factory=set)
+    values: dict = field(default_factory=dict)
+    values_removed: set = field(default_factory=set)
+
+    @property
+    def empty(self) -> bool:
+        return not (
+            self.active_added or self.active_removed or self.fired or self.fired_removed
+            or self.values or self.values_removed
+        )
+
+
+def combine_positions(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Stack per-wallet positions into one frame with a `wallet` column"""
+    parts = [df.assign(wallet=address.lower()) for address, df in frames.items() if df is not None and not df.empty]
+    if not parts:
+        return pd.DataFrame(columns=["wallet", "asset"])
+    return pd.concat(parts, ignore_index=True)
+
+
+if __name__ == "__main__":
+    import sys
+    from batch_fetch import fetch_wallets, load_addresses
+
+    logging.basicConfig(level=logging.INFO)
+    rules = load_rules()
+    if not rules:
+        print("No rules configured. Set ALERT_RULES, e.g. 'curPrice crosses 0.9; percentPnl < -30%'")
+        sys.exit(1)
+
+    addresses = sys.argv[1:] or load_addresses()
+    results = fetch_wallets(addresses)
+    positions = combine_positions({r.address: r.positions for r in results.values() if r.ok})
+    engine = AlertEngine(rules, state_path=os.getenv('ALERT_STATE_PATH', DEFAULT_STATE_PATH))
+    alerts = engine.evaluate(positions)
+    print(alerts.to_string(index=False) if not alerts.empty else "No alerts")
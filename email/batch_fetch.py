@@ -0,0 +1,117 @@
+"""
+Multi-Wallet Batch Fetch
+Asyncio engine that fetches positions for many wallets concurrently
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional
+import logging
+
+import pandas as pd
+
+from polymarket_client import POSITIONS_PAGE_WORKERS, fetch_positions, get_session
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS = "0x22633134dc34f6c9a3bff51a0926c9d209714e26"
+
+
+@dataclass
+class WalletResult:
+    """Outcome of fetching one wallet"""
+    address: str
+    positions: Optional[pd.DataFrame] = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def load_addresses(default: Optional[str] = DEFAULT_ADDRESS) -> List[str]:
+    """
+    Read wallet addresses from the environment
+
+    POLYMARKET_ADDRESSES takes a comma or whitespace separated list and wins
+    over the single POLYMARKET_ADDRESS variable.
+    """
+    raw = os.getenv('POLYMARKET_ADDRESSES') or os.getenv('POLYMARKET_ADDRESS') or default or ""
+    addresses = [a.strip() for a in raw.replace(',', ' ').split() if a.strip()]
+    # Preserve order but drop duplicates
+    return list(dict.fromkeys(addresses))
+
+
+async def iter_wallet_positions(
+    addresses: Iterable[str],
+    concurrency: int = 8,
+    fetch: Callable[[str], pd.DataFrame] = fetch_positions
+) -> AsyncIterator[WalletResult]:
+    """
+    Fetch positions for many wallets, yielding each result as soon as it is ready
+
+    At most `concurrency` wallets are in flight at once. A failing wallet is
+    reported through `WalletResult.error` and does not stop the batch.
+
+    Args:
+        addresses: Wallet addresses to fetch
+        concurrency: Maximum number of wallets fetched at the same time
+        fetch: Blocking fetcher run in a worker thread for each wallet
+
+    Yields:
+        WalletResult in completion order
+    """
+    addresses = list(dict.fromkeys(addresses))
+    if not addresses:
+        return
+
+    # Every wallet in flight may page with several threads; keep them all alive
+    get_session(pool_size=concurrency * POSITIONS_PAGE_WORKERS)
+
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="wallet-fetch")
+
+    async def run(address: str) -> WalletResult:
+        async with semaphore:
+            start = time.monotonic()
+            try:
+                df = await loop.run_in_executor(executor, fetch, address)
+                return WalletResult(address, positions=df, elapsed=time.monotonic() - start)
+            except Exception as e:
+                logger.error(f"Failed to fetch positions for {address}: {str(e)}")
+                return WalletResult(address, error=e, elapsed=time.monotonic() - start)
+
+    tasks = [asyncio.ensure_future(run(address)) for address in addresses]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+        executor.shutdown(wait=False)
+
+
+async def fetch_wallets_async(
+    addresses: Iterable[str],
+    concurrency: int = 8,
+    fetch: Callable[[str], pd.DataFrame] = fetch_positions
+) -> Dict[str, WalletResult]:
+    """Fetch all wallets and return the results keyed by address"""
+    results = {}
+    async for result in iter_wallet_positions(addresses, concurrency=concurrency, fetch=fetch):
+        results[result.address] = result
+    return results
+
+
+def fetch_wallets(
+    addresses: Iterable[str],
+    concurrency: int = 8,
+    fetch: Callable[[str], pd.DataFrame] = fetch_positions
+) -> Dict[str, WalletResult]:
+    """Blocking wrapper around `fetch_wallets_async` for scripts"""
+    return asyncio.run(fetch_wallets_async(addresses, concurrency=concurrency, fetch=fetch))
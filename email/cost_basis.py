@@ -0,0 +1,246 @@
+"""
+Cost Basis and Realized PnL
+Replays a wallet's trade history with FIFO or average-cost accounting,
+vectorized over all assets at once
+"""
+import itertools
+from typing import Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+from trades_store import TradesStore
+
+
+logger = logging.getLogger(__name__)
+
+METHODS = ("fifo", "average")
+
+FILL_COLUMNS = [
+    "asset", "timestamp", "side", "size", "price",
+    "matched_size", "unmatched_size", "cost_basis", "realized_pnl",
+    "holding_seconds", "position", "open_cost",
+]
+
+
+def _group_start_values(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """For each row, `values` at the first row of its group"""
+    starts = np.r_[True, codes[1:] != codes[:-1]]
+    return values[starts][np.cumsum(starts) - 1]
+
+
+def _linear_scan(factor: np.ndarray, add: np.ndarray) -> np.ndarray:
+    """h[k] = factor[k] * h[k-1] + add[k] with h[-1] = 0"""
+    # Not a prefix sum, so one pass in C-driven itertools instead of a cumprod
+    # that underflows after a few thousand partial sells
+    steps = itertools.accumulate(zip(factor.tolist(), add.tolist()), lambda h, fa: fa[0] * h + fa[1], initial=0.0)
+    return np.fromiter(itertools.islice(steps, 1, None), dtype=float, count=len(factor))
+
+
+def replay_trades(trades: pd.DataFrame, method: str = "fifo") -> pd.DataFrame:
+    """
+    Match every sell against earlier buys of the same asset
+
+    FIFO works on cumulative quantities: with B(q) the cost of the first q
+    shares ever bought, a sell taking the account from q0 to q1 shares sold
+    consumed lots worth B(q1) - B(q0). B is piecewise linear in q, so one
+    np.interp over all buys (offset per asset so the curves do not overlap)
+    prices every sell at once; the same trick on quantity-weighted timestamps
+    gives the age of the consumed lots. Sells of shares bought before the
+    recorded history are counted as unmatched and realize nothing.
+
+    Args:
+        trades: Rows as returned by `TradesStore.load` (asset, side, size, price, timestamp)
+        method: "fifo" or "average" (holding periods always follow FIFO lots)
+
+    Returns:
+        One row per trade in (asset, timestamp) order with the matched size,
+        cost basis and realized PnL of sells plus the position and open cost
+        after every trade
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown cost basis method: {method}")
+    if trades.empty:
+        return pd.DataFrame(columns=FILL_COLUMNS)
+
+    # Buys before sells within the same second keep same-block round trips matched
+    side = trades["side"].astype(str).str.upper()
+    df = trades.assign(_sell=side.eq("SELL")).sort_values(["asset", "timestamp", "_sell"], kind="stable")
+    codes = pd.factorize(df["asset"])[0]
+    is_sell = df["_sell"].to_numpy()
+    size = pd.to_numeric(df["size"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    price = pd.to_numeric(df["price"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+    ts = pd.to_numeric(df["timestamp"], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    buy_q = np.where(is_sell, 0.0, size)
+    sell_q = np.where(is_sell, size, 0.0)
+    cum_buy = np.cumsum(buy_q)
+    cum_cost = np.cumsum(buy_q * price)
+    cum_time = np.cumsum(buy_q * ts)
+    base_q = _group_start_values(cum_buy - buy_q, codes)
+    base_c = _group_start_values(cum_cost - buy_q * price, codes)
+
+    # Per-asset running totals; sells beyond what was bought so far are unmatched
+    grouped = pd.Series(sell_q).groupby(codes)
+    local_sold = grouped.cumsum().to_numpy()
+    local_bought = cum_buy - base_q
+    unmatched_total = pd.Series(np.maximum(local_sold - local_bought, 0.0)).groupby(codes).cummax().to_numpy()
+    consumed = local_sold - unmatched_total
+    consumed_prev = pd.Series(consumed).groupby(codes).shift(fill_value=0.0).to_numpy()
+    matched = np.where(is_sell, consumed - consumed_prev, 0.0)
+
+    # Cumulative cost and quantity-weighted buy time as functions of shares bought
+    buys = buy_q > 0
+    xp = np.r_[0.0, cum_buy[buys]]
+    q0, q1 = base_q + consumed_prev, base_q + consumed
+    cost_at_q1 = np.interp(q1, xp, np.r_[0.0, cum_cost[buys]])
+    fifo_basis = cost_at_q1 - np.interp(q0, xp, np.r_[0.0, cum_cost[buys]])
+    time_xp = np.r_[0.0, cum_time[buys]]
+    lot_time = np.interp(q1, xp, time_xp) - np.interp(q0, xp, time_xp)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        holding = np.where(matched > 0, ts - lot_time / matched, np.nan)
+
+    position = local_bought - consumed
+    if method == "fifo":
+        basis = np.where(is_sell, fifo_basis, 0.0)
+        open_cost = (cum_cost - base_c) - (cost_at_q1 - base_c)
+    else:
+        # Average cost: a sell removes its share of the holding's cost, a buy adds to it
+        held_before = np.where(is_sell, position + matched, position - buy_q)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            factor = np.where(is_sell & (held_before > 0), 1.0 - matched / held_before, 1.0)
+        starts = np.r_[True, codes[1:] != codes[:-1]]
+        factor[starts] = 0.0
+        open_cost = _linear_scan(factor, buy_q * price)
+        prev_cost = np.where(starts, 0.0, np.r_[0.0, open_cost[:-1]])
+        basis = np.where(is_sell, prev_cost - open_cost, 0.0)
+
+    fills = pd.DataFrame({
+        "asset": df["asset"].to_numpy(),
+        "timestamp": df["timestamp"].to_numpy(),
+        "side": side.loc[df.index].to_numpy(),
+        "size": size,
+        "price": price,
+        "matched_size": matched,
+        "unmatched_size": sell_q - matched,
+        "cost_basis": basis,
+        "realized_pnl": np.where(is_sell, matched * price - basis, 0.0),
+        "holding_seconds": holding,
+        "position": position,
+        "open_cost": np.maximum(open_cost, 0.0),
+    })
+    for col in ("conditionId", "title", "outcome"):
+        if col in df.columns:
+            fills[col] = df[col].to_numpy()
+    return fills
+
+
+def summarize_by_asset(fills: pd.DataFrame) -> pd.DataFrame:
+    """Per-asset totals: volume, realized PnL, open position and cost, average holding days"""
+    if fills.empty:
+        return pd.DataFrame(columns=[
+            "asset", "title", "outcome", "trades", "bought", "sold", "avg_buy_price", "realized_pnl",
+            "open_size", "open_cost", "avg_holding_days", "unmatched_size", "first_trade", "last_trade",
+        ])
+    is_buy = fills["side"].eq("BUY")
+    work = fills.assign(
+        bought=fills["size"].where(is_buy, 0.0),
+        sold=fills["size"].where(~is_buy, 0.0),
+        buy_cost=(fills["size"] * fills["price"]).where(is_buy, 0.0),
+        held_weight=(fills["holding_seconds"] * fills["matched_size"]).fillna(0.0),
+    )
+    grouped = work.groupby("asset", sort=False)
+    summary = grouped.agg(
+        trades=("size", "size"),
+        bought=("bought", "sum"),
+        sold=("sold", "sum"),
+        buy_cost=("buy_cost", "sum"),
+        realized_pnl=("realized_pnl", "sum"),
+        open_size=("position", "last"),
+        open_cost=("open_cost", "last"),
+        matched=("matched_size", "sum"),
+        held_weight=("held_weight", "sum"),
+        unmatched_size=("unmatched_size", "sum"),
+        first_trade=("timestamp", "min"),
+        last_trade=("timestamp", "max"),
+    )
+    for col in ("title", "outcome"):
+        if col in work.columns:
+            summary[col] = grouped[col].last()
+    summary["avg_buy_price"] = summary["buy_cost"] / summary["bought"].where(summary["bought"] > 0)
+    summary["avg_holding_days"] = summary["held_weight"] / summary["matched"].where(summary["matched"] > 0) / 86400
+    summary = summary.drop(columns=["buy_cost", "matched", "held_weight"]).reset_index()
+    return summary.sort_values("realized_pnl", ascending=False, kind="stable").reset_index(drop=True)
+
+
+def pnl_timeseries(fills: pd.DataFrame, freq: str = "D") -> pd.DataFrame:
+    """
+    Realized PnL per period, its running total and the open cost basis at
+    the end of each period
+    """
+    if fills.empty:
+        return pd.DataFrame(columns=["realized_pnl", "cumulative_realized", "open_cost", "trades", "volume"])
+    # Change in each asset's open cost per trade; their running sum over time is the total open cost
+    open_delta = fills["open_cost"] - fills.groupby("asset", sort=False)["open_cost"].shift(fill_value=0.0)
+    work = pd.DataFrame({
+        "realized_pnl": fills["realized_pnl"].to_numpy(),
+        "open_delta": open_delta.to_numpy(),
+        "volume": (fills["size"] * fills["price"]).to_numpy(),
+    }, index=pd.to_datetime(fills["timestamp"].to_numpy(), unit="s"))
+    periods = work.sort_index(kind="stable").resample(freq)
+    out = pd.DataFrame({
+        "realized_pnl": periods["realized_pnl"].sum(),
+        "trades": periods["volume"].size(),
+        "volume": periods["volume"].sum(),
+        "open_delta": periods["open_delta"].sum(),
+    })
+    out["cumulative_realized"] = out["realized_pnl"].cumsum()
+    out["open_cost"] = out.pop("open_delta").cumsum().clip(lower=0.0)
+    return out[["realized_pnl", "cumulative_realized", "open_cost", "trades", "volume"]]
+
+
+def mark_to_market(summary: pd.DataFrame, positions: pd.DataFrame) -> pd.DataFrame:
+    """Add market value and unrealized PnL of open sizes using positions' `curPrice`"""
+    latest = positions.drop_duplicates("asset", keep="last")
+    prices = pd.Series(pd.to_numeric(latest["curPrice"], errors="coerce").to_numpy(), index=latest["asset"].astype(str))
+    out = summary.copy()
+    out["cur_price"] = out["asset"].astype(str).map(prices)
+    out["market_value"] = out["open_size"] * out["cur_price"]
+    out["unrealized_pnl"] = out["market_value"] - out["open_cost"]
+    out["total_pnl"] = out["realized_pnl"] + out["unrealized_pnl"].fillna(0.0)
+    return out
+
+
+def wallet_pnl(
+    address: str,
+    method: str = "fifo",
+    store: Optional[TradesStore] = None,
+    sync: bool = True
+) -> pd.DataFrame:
+    """Sync a wallet's trades (optional) and return its replayed fills"""
+    store = store or TradesStore()
+    if sync:
+        store.sync(address)
+    return replay_trades(store.load(address), method=method)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    method = "fifo"
+    if "--average" in args:
+        args.remove("--average")
+        method = "average"
+
+    for address in args or ["0x22633134dc34f6c9a3bff51a0926c9d209714e26"]:
+        fills = wallet_pnl(address, method=method)
+        summary = summarize_by_asset(fills)
+        print(f"\n{address} ({method}, {len(fills)} trades)")
+        print(f"  Realized PnL: ${summary['realized_pnl'].sum():+,.2f}")
+        print(f"  Open cost:    ${summary['open_cost'].sum():,.2f}")
+        if summary["unmatched_size"].sum() > 0:
+            print(f"  Unmatched sells: {summary['unmatched_size'].sum():,.1f} shares bought before the recorded history")
+        print(summary.head(20).to_string(index=False))
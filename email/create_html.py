@@ -1,21 +1,157 @@
 import pandas as pd
-import requests
 
-def get_user_positions(address: str):
-    URL = f"https://data-api.polymarket.com/positions?user={address}"
+from polymarket_client import fetch_positions
+from markets_store import MarketsStore, enrich_positions
+from snapshot_store import record_snapshot
 
-    data = requests.get(URL).json()
-
-    df = pd.DataFrame(data)
+def get_user_positions(address: str, record: bool = True):
+    # Paginated fetch over the shared keep-alive session
+    df = fetch_positions(address)
+    # Keep every fetch in the snapshot history (POLYMARKET_SNAPSHOTS=false to disable)
+    if record:
+        record_snapshot(address, df)
     return df
 
+import asyncio
+import io
+import multiprocessing
+import os
 import pandas as pd
 import numpy as np
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
+from typing import IO, Callable, Dict, Iterator, List, Optional, Union
 
-def df_to_pretty_html_marketstyle(
+from report_fingerprint import ReportState, RowCache, positions_fingerprint, row_hashes
+from report_template import iter_report, render_footer, render_stats_bar
+
+# Rows rendered per chunk when streaming the report
+STREAM_CHUNK_ROWS = 500
+
+# Render workers must not be forked from a process whose fetch threads hold
+# session, rate limiter, logging and SQLite locks
+RENDER_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_SEPARATOR_ROW = '<tr class="separator-row"><td colspan="4"></td></tr>\n'
+
+
+def _fmt_cents(x):
+    if pd.isna(x): return ""
+    return f"{float(x):.0f}¢"
+
+
+def _fmt_money(x):
+    if pd.isna(x): return ""
+    return f"${float(x):,.2f}"
+
+
+def _fmt_col(col, fmt):
+    # Format the non-null values of a column, leaving "" for missing ones
+    out = pd.Series([""] * len(col), dtype=object)
+    mask = col.notna().to_numpy()
+    out[mask] = [fmt(x) for x in col.to_numpy()[mask]]
+    return out
+
+
+def _render_row_cells(titles, slugs, logos, side, shares, avg_c, cur_c, value, cash, pct01, sparks=None) -> pd.Series:
+    """Render the <tr> of every position in one slice of the (already sorted) frame"""
+    empty = pd.Series([""] * len(titles), dtype=object)
+
+    # ---- MARKET cell ----
+    title_txt = titles.where(titles.notna(), "")
+    has_slug = slugs.notna() & (slugs.astype(str).str.lower() != "nan") & (slugs.astype(str) != "")
+    slug = slugs.where(has_slug, "").astype(str)
+    logo = logos.where(logos.notna() & (logos.astype(str).str.strip() != ""), "").astype(str)
+    side_val = side.where(side.notna() & (side != ""), "").astype(str)
+
+    # link & logo
+    title_html = (
+        '<a class="title-link" target="_blank" href="https://polymarket.com/market/' + slug + '">' + title_txt + '</a>'
+    ).where(has_slug, '<span class="title-text">' + title_txt + '</span>')
+    logo_html = ('<img class="logo" src="' + logo + '" alt="logo">').where(logo != "", "")
+
+    # Create chip with appropriate color
+    side_lower = side_val.str.lower()
+    chip_html = (
+        empty
+        .mask(side_val != "", '<span class="chip">' + side_val + '</span>')
+        .mask(side_lower == "no", '<span class="chip chip-no">' + side_val + '</span>')
+        .mask(side_lower == "yes", '<span class="chip chip-yes">' + side_val + '</span>')
+    )
+
+    # Position info
+    shares_txt = _fmt_col(shares, lambda x: f'{x:,.1f} shares')
+    avg_txt = _fmt_col(avg_c, lambda x: f'at {_fmt_cents(x)}')
+    position_info = shares_txt + empty.mask((shares_txt != "") & (avg_txt != ""), " ") + avg_txt
+    position_html = ('<div class="position-info">' + position_info + '</div>').where(position_info != "", "")
+
+    # New layout with fixed chip position
+    market_cells = (
+        '<div class="market-wrap">\n                ' + logo_html
+        + '\n                <div class="market-content">'
+        + '\n                    <div class="market-header">'
+        + '\n                        <div class="market-title">' + title_html + '</div>'
+        + '\n                        <div class="market-chip">' + chip_html + '</div>'
+        + '\n                    </div>'
+        + '\n                    ' + position_html
+        + '\n                </div>'
+        + '\n            </div>'
+    )
+
+    # ---- AVG / CURRENT / VALUE ----
+    avg_disp = _fmt_col(avg_c, _fmt_cents)
+    cur_disp = _fmt_col(cur_c, _fmt_cents)
+    if sparks is not None:
+        # Optional price-history sparkline (inline SVG) under the current price
+        spark = sparks.where(sparks.notna(), "").astype(str)
+        cur_disp = cur_disp + ('<div class="spark" style="margin-top: 4px;">' + spark + '</div>').where(spark != "", "")
+
+    # PnL line: "$cash (pct%)", coloured by the sign of cash, or of pct when cash is missing
+    cash_s = _fmt_col(cash, _fmt_money)
+    pct_s = _fmt_col(pct01, lambda x: f"({(x*100):.2f}%)")
+    positive = (cash.notna() & (cash >= 0)) | (cash.isna() & pct01.notna() & (pct01 >= 0))
+    sign = empty.mask(positive, "pos").where(positive, "neg")
+    inner = cash_s + empty.mask((cash_s != "") & (pct_s != ""), " ") + pct_s
+    pline = ('<span class="pnl ' + sign + '">' + inner + '</span>').where(cash.notna() | pct01.notna(), "")
+
+    vline = _fmt_col(value, _fmt_money)
+    value_cells = '<div class="val">' + vline + '</div>' + ('<div class="sub">' + pline + '</div>').where(pline != "", "")
+
+    return (
+        '<tr><td>' + market_cells
+        + '</td><td>' + avg_disp
+        + '</td><td>' + cur_disp
+        + '</td><td>' + value_cells
+        + '</td></tr>'
+    )
+
+
+def _cached_row_cells(columns, row_cache: RowCache) -> pd.Series:
+    """Like _render_row_cells, but only renders rows whose hash is not cached yet"""
+    keys = row_hashes(pd.DataFrame(dict(enumerate(columns)))).tolist()
+    missing = [i for i, key in enumerate(keys) if key not in row_cache]
+    if missing:
+        rendered = _render_row_cells(*[col.iloc[missing].reset_index(drop=True) for col in columns])
+        row_cache.update(dict(zip([keys[i] for i in missing], rendered.tolist())))
+    return pd.Series([row_cache.get(key) for key in keys], dtype=object)
+
+
+def _join_rows(rows: pd.Series, start: int) -> str:
+    # ---- Build HTML table with separators every 5 rows ----
+    position = np.arange(start, start + len(rows))
+    separators = pd.Series(np.where((position > 0) & (position % 5 == 0), _SEPARATOR_ROW, ""), dtype=object)
+    return '\n'.join((separators + rows.reset_index(drop=True)).tolist())
+
+
+def report_order(df: pd.DataFrame, value_col: str = "currentValue") -> np.ndarray:
+    """Positions of the rows the report shows, largest value first; zero and null values are left out"""
+    value = pd.to_numeric(df[value_col], errors="coerce").reset_index(drop=True)
+    return value[value > 0].sort_values(ascending=False).index.to_numpy()
+
+
+def iter_report_html(
     df: pd.DataFrame,
-    out_path: str = "polymarket_positions.html",
     title_col: str = "title",          # title text
     slug_col: str = "marketSlug",      # for hyperlink
     logo_col: str = "icon",            # Polymarket logo/icon column
@@ -26,19 +162,37 @@ def df_to_pretty_html_marketstyle(
     value_col: str = "currentValue",   # $
     cash_pnl_col: str = "cashPnl",     # $
     pct_pnl_col: str = "percentPnl",   # 0–1 or 0–100
-):
+    sparkline_col: str = "sparkline",  # optional inline SVG, see price_history.position_sparklines
+    chunk_rows: int = STREAM_CHUNK_ROWS,
+    row_cache: Optional[RowCache] = None,
+    prepared: bool = False,
+) -> Iterator[str]:
     """
-    Render a Polymarket-like HTML table:
-      MARKET (logo + clickable title + subline), AVG (¢), CURRENT (¢), VALUE ($ + PnL)
-    Automatically sorts by value_col in descending order.
+    Yield the Polymarket-like HTML report in chunks
+
+    Only `chunk_rows` table rows are rendered at a time, so memory does not
+    grow with the number of positions beyond the positions frame itself.
+    Column scaling (¢ vs $, 0–1 vs 0–100) is still decided over all rows.
+    With a `row_cache`, rows whose content hash was rendered before are reused.
+    When the frame has a `sparkline_col`, its SVG is shown under the current
+    price. The input frame is neither modified nor copied; only the displayed
+    columns are gathered, in report order. Pass `prepared=True` for frames
+    from `prepare_positions`, which are already filtered and sorted.
     """
-    df = df.copy()
+    # ---- sort by value and filter out zero values ----
+    order = report_order(df, value_col) if value_col in df.columns and not prepared else None
+    n = len(df) if order is None else len(order)
+
+    # Cells are built column-wise, so every column must share a positional index
+    def _column(colname):
+        col = df[colname] if order is None else df[colname].iloc[order]
+        return col.reset_index(drop=True)
 
     # ---- helpers ----
     def _to_pct01(colname):
         if colname not in df.columns:
-            return pd.Series([np.nan] * len(df))
-        col = pd.to_numeric(df[colname], errors="coerce")
+            return pd.Series([np.nan] * n)
+        col = pd.to_numeric(_column(colname), errors="coerce")
         if col.notna().any():
             s = col.dropna().iloc[0]
             if abs(s) > 1.5:
@@ -47,508 +201,231 @@ def df_to_pretty_html_marketstyle(
 
     def _to_cents(colname):
         if colname not in df.columns:
-            return pd.Series([np.nan]*len(df))
-        col = pd.to_numeric(df[colname], errors="coerce")
+            return pd.Series([np.nan]*n)
+        col = pd.to_numeric(_column(colname), errors="coerce")
         med = col.dropna().median() if col.notna().any() else np.nan
         if pd.notna(med) and med <= 1.5:
             col = col * 100.0
         return col
 
-    def _fmt_cents(x):
-        if pd.isna(x): return ""
-        return f"{float(x):.0f}¢"
-
-    def _fmt_money(x):
-        if pd.isna(x): return ""
-        return f"${float(x):,.2f}"
-
-    def _fmt_pnl_line(cash, pct01):
-        if pd.isna(cash) and pd.isna(pct01):
-            return ""
-        cash_s = _fmt_money(cash) if pd.notna(cash) else ""
-        pct_s = f"{(pct01*100):.2f}%" if pd.notna(pct01) else ""
-        sign = "pos" if (pd.notna(cash) and cash >= 0) or (pd.isna(cash) and pd.notna(pct01) and pct01 >= 0) else "neg"
-        inner = []
-        if cash_s: inner.append(cash_s)
-        if pct_s: inner.append(f"({pct_s})")
-        return f'<span class="pnl {sign}">{" ".join(inner)}</span>'
-
-    # ---- sort by value and filter out zero values ----
-    if value_col in df.columns:
-        df[value_col] = pd.to_numeric(df[value_col], errors="coerce")
-        # Filter out positions with zero or null value
-        df = df[df[value_col] > 0].copy()
-        df = df.sort_values(by=value_col, ascending=False).reset_index(drop=True)
-
-    # ---- MARKET cell ----
     titles = (
-        df[title_col].astype(str)
+        _column(title_col).astype(str)
         if title_col in df.columns
-        else (df["marketQuestion"].astype(str) if "marketQuestion" in df.columns else pd.Series([""]*len(df)))
+        else (_column("marketQuestion").astype(str) if "marketQuestion" in df.columns else pd.Series([""]*n))
     )
-    slugs = df[slug_col].astype(str) if slug_col in df.columns else pd.Series([None]*len(df))
-    logos = df[logo_col].astype(str) if logo_col in df.columns else pd.Series([""]*len(df))
-    side = df[side_col].astype(str) if side_col in df.columns else pd.Series([""]*len(df))
-    shares = pd.to_numeric(df[size_col], errors="coerce") if size_col in df.columns else pd.Series([np.nan]*len(df))
+    slugs = _column(slug_col).astype(str) if slug_col in df.columns else pd.Series([None]*n)
+    logos = _column(logo_col).astype(str) if logo_col in df.columns else pd.Series([""]*n)
+    side = _column(side_col).astype(str) if side_col in df.columns else pd.Series([""]*n)
+    shares = pd.to_numeric(_column(size_col), errors="coerce") if size_col in df.columns else pd.Series([np.nan]*n)
     avg_c = _to_cents(avg_price_col)
+    cur_c = _to_cents(cur_price_col)
+    value = pd.to_numeric(_column(value_col), errors="coerce") if value_col in df.columns else pd.Series([np.nan]*n)
+    cash = pd.to_numeric(_column(cash_pnl_col), errors="coerce") if cash_pnl_col in df.columns else pd.Series([np.nan]*n)
+    pct01 = _to_pct01(pct_pnl_col)
+    columns = (titles, slugs, logos, side, shares, avg_c, cur_c, value, cash, pct01)
+    if sparkline_col in df.columns:
+        columns += (_column(sparkline_col),)
 
-    market_cells = []
-    for i in range(len(df)):
-        title_txt = titles.iloc[i] if pd.notna(titles.iloc[i]) else ""
-        slug = slugs.iloc[i] if pd.notna(slugs.iloc[i]) and str(slugs.iloc[i]).lower() != "nan" else None
-        logo = logos.iloc[i] if pd.notna(logos.iloc[i]) and str(logos.iloc[i]).strip() != "" else ""
-        side_val = side.iloc[i] if pd.notna(side.iloc[i]) and side.iloc[i] != "" else ""
-
-        # link & logo
-        if slug:
-            link = f'https://polymarket.com/market/{slug}'
-            title_html = f'<a class="title-link" target="_blank" href="{link}">{title_txt}</a>'
-        else:
-            title_html = f'<span class="title-text">{title_txt}</span>'
-        logo_html = f'<img class="logo" src="{logo}" alt="logo">' if logo else ""
-
-        # Create chip with appropriate color
-        if side_val.lower() == "yes":
-            chip_html = f'<span class="chip chip-yes">{side_val}</span>'
-        elif side_val.lower() == "no":
-            chip_html = f'<span class="chip chip-no">{side_val}</span>'
-        elif side_val != "":
-            chip_html = f'<span class="chip">{side_val}</span>'
-        else:
-            chip_html = ''
-
-        # Position info
-        position_bits = []
-        if pd.notna(shares.iloc[i]):
-            position_bits.append(f'{shares.iloc[i]:,.1f} shares')
-        if pd.notna(avg_c.iloc[i]):
-            position_bits.append(f'at {_fmt_cents(avg_c.iloc[i])}')
-        position_info = " ".join(position_bits)
-        position_html = f'<div class="position-info">{position_info}</div>' if position_info else ""
-
-        # New layout with fixed chip position
-        market_cells.append(
-            f'''<div class="market-wrap">
-                {logo_html}
-                <div class="market-content">
-                    <div class="market-header">
-                        <div class="market-title">{title_html}</div>
-                        <div class="market-chip">{chip_html}</div>
-                    </div>
-                    {position_html}
-                </div>
-            </div>'''
-        )
+    def _tbody() -> Iterator[str]:
+        for start in range(0, n, chunk_rows):
+            stop = min(start + chunk_rows, n)
+            chunk = [col.iloc[start:stop].reset_index(drop=True) for col in columns]
+            rows = _render_row_cells(*chunk) if row_cache is None else _cached_row_cells(chunk, row_cache)
+            if start > 0:
+                yield '\n'
+            yield _join_rows(rows, start)
 
-    # ---- AVG / CURRENT / VALUE ----
-    cur_c = _to_cents(cur_price_col)
-    avg_disp = [_fmt_cents(x) for x in avg_c]
-    cur_disp = [_fmt_cents(x) for x in cur_c]
+    yield from iter_report(render_stats_bar(n, value.sum(), cash.sum()), _tbody(), render_footer())
 
-    value = pd.to_numeric(df[value_col], errors="coerce") if value_col in df.columns else pd.Series([np.nan]*len(df))
-    cash = pd.to_numeric(df[cash_pnl_col], errors="coerce") if cash_pnl_col in df.columns else pd.Series([np.nan]*len(df))
-    pct01 = _to_pct01(pct_pnl_col)
 
-    value_cells = []
-    for i in range(len(df)):
-        vline = _fmt_money(value.iloc[i]) if pd.notna(value.iloc[i]) else ""
-        pline = _fmt_pnl_line(
-            cash.iloc[i] if i < len(cash) else np.nan,
-            pct01.iloc[i] if i < len(pct01) else np.nan
-        )
-        value_cells.append(f'<div class="val">{vline}</div>' + (f'<div class="sub">{pline}</div>' if pline else ""))
+def write_report_html(df: pd.DataFrame, fp: IO, **kwargs) -> None:
+    """
+    Stream the report into any writable: a text file, a binary file or an
+    HTTP response body. Binary targets receive UTF-8 bytes.
+    """
+    binary = not isinstance(fp, io.TextIOBase)
+    for chunk in iter_report_html(df, **kwargs):
+        fp.write(chunk.encode("utf-8") if binary else chunk)
 
-    display = pd.DataFrame({
-        "MARKET": market_cells,
-        "AVG": avg_disp,
-        "CURRENT": cur_disp,
-        "VALUE": value_cells,
-    })
 
-    # ---- Build HTML table with separators every 5 rows ----
-    rows_html = []
-    for i, row in display.iterrows():
-        # Add separator every 5 rows (but not before first row)
-        if i > 0 and i % 5 == 0:
-            rows_html.append('<tr class="separator-row"><td colspan="4"></td></tr>')
-
-        # Add data row
-        row_html = '<tr>'
-        for col in display.columns:
-            row_html += f'<td>{row[col]}</td>'
-        row_html += '</tr>'
-        rows_html.append(row_html)
-
-    tbody_content = '\n'.join(rows_html)
-
-    html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="utf-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1">
-    <title>Polymarket Positions Report</title>
-    <!--[if mso]>
-    <noscript>
-        <xml>
-            <o:OfficeDocumentSettings>
-                <o:PixelsPerInch>96</o:PixelsPerInch>
-            </o:OfficeDocumentSettings>
-        </xml>
-    </noscript>
-    <![endif]-->
-    <style>
-        /* Reset styles for email clients */
-        body, table, td, a {{ -webkit-text-size-adjust: 100%; -ms-text-size-adjust: 100%; }}
-        table, td {{ mso-table-lspace: 0pt; mso-table-rspace: 0pt; }}
-        img {{ -ms-interpolation-mode: bicubic; border: 0; outline: none; text-decoration: none; }}
-
-        /* Email body styles */
-        body {{
-            margin: 0 !important;
-            padding: 0 !important;
-            background-color: #f4f7fa !important;
-            font-family: 'Segoe UI', Tahoma, Geneva, Verdana, Arial, sans-serif !important;
-        }}
-
-        /* Container */
-        .email-container {{
-            max-width: 680px;
-            margin: 0 auto;
-            background-color: #ffffff;
-        }}
-
-        /* Header styles */
-        .header {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-            padding: 30px 20px;
-            text-align: center;
-        }}
-
-        .header h1 {{
-            margin: 0;
-            color: #ffffff;
-            font-size: 28px;
-            font-weight: 600;
-            text-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-
-        /* Stats bar */
-        .stats-bar {{
-            background-color: #f8fafc;
-            padding: 20px;
-            border-bottom: 2px solid #e2e8f0;
-        }}
-
-        .stats-container {{
-            display: table;
-            width: 100%;
-            table-layout: fixed;
-        }}
-
-        .stat-item {{
-            display: table-cell;
-            text-align: center;
-            padding: 0 10px;
-        }}
-
-        .stat-value {{
-            font-size: 24px;
-            font-weight: bold;
-            color: #4a5568;
-        }}
-
-        .stat-label {{
-            font-size: 12px;
-            color: #718096;
-            margin-top: 4px;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }}
-
-        /* Table styles */
-        .positions-table {{
-            width: 100%;
-            border-collapse: separate;
-            border-spacing: 0;
-            margin: 0;
-            padding: 20px;
-            background-color: #ffffff;
-        }}
-
-        .positions-table th {{
-            background: linear-gradient(135deg, #f6f9fc 0%, #e9ecef 100%);
-            color: #2d3748;
-            font-weight: 600;
-            font-size: 12px;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-            padding: 12px 15px;
-            text-align: left;
-            border-bottom: 2px solid #cbd5e0;
-        }}
-
-        .positions-table td {{
-            padding: 15px;
-            border-bottom: 1px solid #e2e8f0;
-            color: #4a5568;
-            font-size: 14px;
-            vertical-align: middle;
-            background-color: #ffffff;
-        }}
-
-        /* Alternating row colors */
-        .positions-table tr:nth-child(odd) td {{
-            background-color: #fafbfc;
-        }}
-
-        /* Hover effect for desktop */
-        .positions-table tr:hover td {{
-            background-color: #f0f4f8 !important;
-            transition: background-color 0.2s ease;
-        }}
-
-        /* Separator row styling */
-        .separator-row td {{
-            padding: 0 !important;
-            height: 3px !important;
-            background: linear-gradient(90deg, #667eea 0%, #764ba2 100%);
-            border: none !important;
-        }}
-
-        /* Market cell styling */
-        .market-wrap {{
-            display: flex;
-            align-items: flex-start;
-            width: 100%;
-        }}
-
-        .logo {{
-            width: 32px;
-            height: 32px;
-            border-radius: 8px;
-            margin-right: 12px;
-            flex-shrink: 0;
-            box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        }}
-
-        .market-content {{
-            flex: 1;
-            min-width: 0;
-        }}
-
-        .market-header {{
-            display: flex;
-            justify-content: space-between;
-            align-items: flex-start;
-            gap: 10px;
-            margin-bottom: 4px;
-        }}
-
-        .market-title {{
-            flex: 1;
-            min-width: 0;
-        }}
-
-        .market-chip {{
-            flex-shrink: 0;
-        }}
-
-        .title-link {{
-            color: #5b21b6;
-            text-decoration: none;
-            font-weight: 500;
-            font-size: 14px;
-            display: block;
-        }}
-
-        .title-link:hover {{
-            color: #7c3aed;
-            text-decoration: underline;
-        }}
-
-        .title-text {{
-            color: #2d3748;
-            font-weight: 500;
-            font-size: 14px;
-            display: block;
-        }}
-
-        /* Position info styling */
-        .position-info {{
-            color: #718096;
-            font-size: 12px;
-            margin-top: 2px;
-        }}
-
-        /* Chip styling */
-        .chip {{
-            display: inline-block;
-            padding: 4px 12px;
-            border-radius: 12px;
-            font-size: 11px;
-            font-weight: 700;
-            color: #ffffff;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-            white-space: nowrap;
-        }}
-
-        .chip-yes {{
-            background: linear-gradient(135deg, #10b981 0%, #059669 100%);
-        }}
-
-        .chip-no {{
-            background: linear-gradient(135deg, #ef4444 0%, #dc2626 100%);
-        }}
-
-        .chip:not(.chip-yes):not(.chip-no) {{
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        }}
-
-        /* Value styling */
-        .val {{
-            font-weight: 600;
-            font-size: 15px;
-            color: #2d3748;
-        }}
-
-        /* PnL styling */
-        .pnl {{
-            font-weight: 500;
-            font-size: 13px;
-        }}
-
-        .pnl.pos {{
-            color: #10b981;
-        }}
-
-        .pnl.neg {{
-            color: #ef4444;
-        }}
-
-        /* Price columns */
-        .positions-table td:nth-child(2),
-        .positions-table td:nth-child(3) {{
-            font-weight: 500;
-            color: #4a5568;
-            text-align: center;
-        }}
-
-        /* Footer */
-        .footer {{
-            background-color: #f8fafc;
-            padding: 30px 20px;
-            text-align: center;
-            border-top: 2px solid #e2e8f0;
-        }}
-
-        .footer-text {{
-            color: #718096;
-            font-size: 12px;
-            margin: 0;
-        }}
-
-        .footer-link {{
-            color: #667eea;
-            text-decoration: none;
-        }}
-
-        /* Mobile responsiveness */
-        @media only screen and (max-width: 600px) {{
-            .email-container {{
-                width: 100% !important;
-            }}
-
-            .header h1 {{
-                font-size: 24px;
-            }}
-
-            .positions-table {{
-                padding: 10px;
-            }}
-
-            .positions-table th,
-            .positions-table td {{
-                padding: 10px 8px;
-                font-size: 12px;
-            }}
-
-            .logo {{
-                width: 24px;
-                height: 24px;
-            }}
-
-            .stat-value {{
-                font-size: 20px;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="email-container">
-        <!-- Header -->
-        <div class="header">
-            <h1>📊 Polymarket Positions Report</h1>
-        </div>
-
-        <!-- Stats Bar -->
-        <div class="stats-bar">
-            <div class="stats-container">
-                <div class="stat-item">
-                    <div class="stat-value">{len(df)}</div>
-                    <div class="stat-label">Total Positions</div>
-                </div>
-                <div class="stat-item">
-                    <div class="stat-value">${value.sum():,.0f}</div>
-                    <div class="stat-label">Total Value</div>
-                </div>
-                <div class="stat-item">
-                    <div class="stat-value" style="color: {'#10b981' if cash.sum() >= 0 else '#ef4444'}">
-                        ${cash.sum():+,.0f}
-                    </div>
-                    <div class="stat-label">Total P&L</div>
-                </div>
-            </div>
-        </div>
-
-        <!-- Positions Table -->
-        <table class="positions-table">
-            <thead>
-                <tr>
-                    <th>MARKET</th>
-                    <th style="text-align: center;">AVG</th>
-                    <th style="text-align: center;">CURRENT</th>
-                    <th>VALUE</th>
-                </tr>
-            </thead>
-            <tbody>
-                {tbody_content}
-            </tbody>
-        </table>
-
-        <!-- Footer -->
-        <div class="footer">
-            <p class="footer-text">
-                Generated on {pd.Timestamp.now().strftime('%B %d, %Y at %I:%M %p')}
-            </p>
-            <p class="footer-text">
-                View on <a href="https://polymarket.com" class="footer-link">Polymarket.com</a>
-            </p>
-        </div>
-    </div>
-</body>
-</html>"""
-
-    Path(out_path).write_text(html, encoding="utf-8")
+def render_report_html(df: pd.DataFrame, **kwargs) -> str:
+    """Render the whole report into one string, for callers that need it in memory"""
+    buf = io.StringIO()
+    write_report_html(df, buf, **kwargs)
+    return buf.getvalue()
+
+
+def df_to_pretty_html_marketstyle(
+    df: pd.DataFrame,
+    out_path: str = "polymarket_positions.html",
+    title_col: str = "title",          # title text
+    slug_col: str = "marketSlug",      # for hyperlink
+    logo_col: str = "icon",            # Polymarket logo/icon column
+    side_col: str = "outcome",         # "Yes"/"No"/"Up"/"Down"
+    size_col: str = "size",            # shares
+    avg_price_col: str = "avgPrice",   # $ (0.63) or ¢ (63)
+    cur_price_col: str = "curPrice",   # same
+    value_col: str = "currentValue",   # $
+    cash_pnl_col: str = "cashPnl",     # $
+    pct_pnl_col: str = "percentPnl",   # 0–1 or 0–100
+    sparkline_col: str = "sparkline",  # optional inline SVG
+    row_cache: Optional[RowCache] = None,
+    prepared: bool = False,
+):
+    """
+    Render a Polymarket-like HTML table:
+      MARKET (logo + clickable title + subline), AVG (¢), CURRENT (¢), VALUE ($ + PnL)
+    Automatically sorts by value_col in descending order.
+    The document is streamed to out_path chunk by chunk.
+    """
+    with open(Path(out_path), "w", encoding="utf-8") as f:
+        write_report_html(
+            df, f,
+            title_col=title_col, slug_col=slug_col, logo_col=logo_col, side_col=side_col,
+            size_col=size_col, avg_price_col=avg_price_col, cur_price_col=cur_price_col,
+            value_col=value_col, cash_pnl_col=cash_pnl_col, pct_pnl_col=pct_pnl_col,
+            sparkline_col=sparkline_col, row_cache=row_cache, prepared=prepared,
+        )
     return out_path
 
 
 
+def prepare_positions(df: pd.DataFrame) -> pd.DataFrame:
+    """Fill in display columns and keep the rows the report shows, in report order"""
+    # Ensure df['title'] is present; if your API returns 'marketQuestion', you can map:
+    if 'title' not in df.columns and 'marketQuestion' in df.columns:
+        df['title'] = df['marketQuestion']
+
+    # Resolve missing titles/slugs/icons from the local markets catalog, if one was synced
+    markets = MarketsStore.open_existing()
+    if markets is not None:
+        df = enrich_positions(df, markets)
+
+    # Filter out positions with zero or null value and sort by value, once for
+    # the fingerprint and the renderer
+    original_count = len(df)
+    if 'currentValue' in df.columns:
+        df = df.iloc[report_order(df)].reset_index(drop=True)
+        if len(df) < original_count:
+            print(f"Filtering: {original_count} positions → {len(df)} positions (removed {original_count - len(df)} with zero value)")
+
+    return df
+
+
+def report_path(address: str, out_dir: str = ".") -> str:
+    """Per-wallet report file name used by batch runs"""
+    return str(Path(out_dir) / f"polymarket_positions_{address.lower()}.html")
+
+
+def report_path_for(address: str, multiple: bool) -> str:
+    """Keep the historical file name for a single wallet, one file per wallet otherwise"""
+    if not multiple:
+        return "polymarket_positions.html"
+    return report_path(address)
+
+
+def _render_wallet_report(address: str, df: pd.DataFrame, html_path: str, skip_unchanged: bool) -> str:
+    # Runs in a worker process: normalization and rendering are CPU-bound
+    df = prepare_positions(df)
+    if skip_unchanged:
+        state = ReportState()
+        fingerprint = positions_fingerprint(df)
+        if not state.has_changed(address, fingerprint) and Path(html_path).exists():
+            print(f"No changes for {address} since the last report; skipping render")
+            return html_path
+    out = df_to_pretty_html_marketstyle(df, out_path=html_path, prepared=True)
+    if skip_unchanged:
+        state.record(address, fingerprint)
+    return out
+
+
+async def create_reports_async(
+    addresses: List[str],
+    out_dir: str = ".",
+    workers: Optional[int] = None,
+    concurrency: int = 8,
+    html_path_for: Optional[Callable[[str], str]] = None,
+    skip_unchanged: bool = False
+) -> Dict[str, Union[str, Exception]]:
+    """
+    Fetch many wallets asynchronously and render their reports in a process pool
+
+    Each wallet is handed to the pool as soon as its positions arrive, so
+    rendering overlaps with the remaining fetches.
+
+    Args:
+        addresses: Polymarket wallet addresses
+        out_dir: Directory for the per-wallet HTML files
+        workers: Render processes (defaults to RENDER_WORKERS or the CPU count)
+        concurrency: Wallets fetched at the same time
+        html_path_for: Optional override mapping an address to its output path
+        skip_unchanged: Keep the existing file for wallets whose positions
+            fingerprint matches their last report
+
+    Returns:
+        Output path, or the exception raised, keyed by address
+    """
+    from batch_fetch import iter_wallet_positions
+
+    workers = workers or int(os.getenv('RENDER_WORKERS', '0')) or os.cpu_count() or 1
+    html_path_for = html_path_for or (lambda address: report_path(address, out_dir))
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    loop = asyncio.get_running_loop()
+    results: Dict[str, Union[str, Exception]] = {}
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(RENDER_START_METHOD)) as pool:
+        async def render(address: str, df: pd.DataFrame):
+            try:
+                out = await loop.run_in_executor(
+                    pool, _render_wallet_report, address, df, html_path_for(address), skip_unchanged
+                )
+                print("Saved HTML to:", out)
+                results[address] = out
+            except Exception as e:
+                print(f"Error rendering report for {address}: {str(e)}")
+                results[address] = e
+
+        renders = []
+        async for result in iter_wallet_positions(addresses, concurrency=concurrency, fetch=get_user_positions):
+            if not result.ok:
+                print(f"Error fetching {result.address}: {str(result.error)}")
+                results[result.address] = result.error
+                continue
+            renders.append(asyncio.ensure_future(render(result.address, result.positions)))
+
+        await asyncio.gather(*renders)
+
+    return results
+
+
+def create_reports(
+    addresses: List[str],
+    out_dir: str = ".",
+    workers: Optional[int] = None,
+    concurrency: int = 8,
+    html_path_for: Optional[Callable[[str], str]] = None,
+    skip_unchanged: bool = False
+) -> Dict[str, Union[str, Exception]]:
+    """Blocking wrapper around `create_reports_async`, one HTML file per wallet"""
+    return asyncio.run(create_reports_async(
+        addresses, out_dir=out_dir, workers=workers, concurrency=concurrency,
+        html_path_for=html_path_for, skip_unchanged=skip_unchanged
+    ))
+
+
+# Rendered rows per wallet, reused across reports in long-running processes
+_row_caches: Dict[str, RowCache] = {}
+
+
 def create_and_send_report(
     address: str,
-    recipient_email: str = None,
+    recipient_email: Union[str, List[str]] = None,
     send_email: bool = False,
-    html_path: str = "polymarket_positions.html"
+    html_path: Optional[str] = "polymarket_positions.html",
+    df: pd.DataFrame = None,
+    skip_unchanged: bool = False,
+    sender=None
 ):
     """
     Create HTML report and optionally send via email
@@ -556,51 +433,87 @@ def create_and_send_report(
 
     Args:
         address: Polymarket wallet address
-        recipient_email: Email to send report to
+        recipient_email: Email, or list of emails each sent their own copy
         send_email: Whether to send email after creating HTML
-        html_path: Path to save HTML file
+        html_path: Path to save HTML file, or None to keep the report in memory only
+        df: Positions already fetched for this address (fetched here if None)
+        skip_unchanged: Skip rendering and sending when the positions
+            fingerprint matches the last report for this address
+        sender: GmailSender or MailQueue owned by the caller, so one
+            connection pool serves many reports; a temporary GmailSender is
+            opened and closed if None. With a MailQueue the email is only
+            queued: the second return value is then a Future resolving to
+            whether every copy was delivered, and the report counts as
+            emailed once it resolves to True.
     """
     # Get positions data
-    df = get_user_positions(address)
-
-    # Ensure df['title'] is present; if your API returns 'marketQuestion', you can map:
-    if 'title' not in df.columns and 'marketQuestion' in df.columns:
-        df['title'] = df['marketQuestion']
-
-    # Log filtering info
-    original_count = len(df)
-    if 'currentValue' in df.columns:
-        df_temp = df.copy()
-        df_temp['currentValue'] = pd.to_numeric(df_temp['currentValue'], errors="coerce")
-        filtered_count = len(df_temp[df_temp['currentValue'] > 0])
-        if filtered_count < original_count:
-            print(f"Filtering: {original_count} positions → {filtered_count} positions (removed {original_count - filtered_count} with zero value)")
-
-    # Generate HTML (filtering happens inside this function)
-    out = df_to_pretty_html_marketstyle(df, out_path=html_path)
-    print("Saved HTML to:", out)
+    if df is None:
+        df = get_user_positions(address)
+
+    df = prepare_positions(df)
+
+    state = ReportState() if skip_unchanged else None
+    fingerprint = positions_fingerprint(df) if state is not None else None
+    unchanged = state is not None and not state.has_changed(address, fingerprint)
+    if unchanged and (html_path is None or Path(html_path).exists()):
+        # Still go on if this version was rendered but never made it out by email
+        if not (send_email and recipient_email and state.has_changed(address, fingerprint, kind="email")):
+            print(f"No changes for {address} since the last report; skipping render and email")
+            return html_path, None
+
+    # Render once in memory (filtering happens inside); the same string goes
+    # to the file and to the mailer
+    row_cache = _row_caches.setdefault(address.lower(), RowCache())
+    html_content = render_report_html(df, row_cache=row_cache, prepared=True)
+    out = html_path
+    if html_path is not None:
+        with open(Path(html_path), "w", encoding="utf-8") as f:
+            f.write(html_content)
+        print("Saved HTML to:", out)
+    if state is not None:
+        state.record(address, fingerprint)
 
     # Optionally send email
     if send_email and recipient_email:
+        if state is not None and not state.has_changed(address, fingerprint, kind="email"):
+            print(f"Report for {address} was already emailed; skipping email")
+            return out, None
         try:
             from gmail_sender import GmailSender
-
-            sender = GmailSender()
-
-            # Read the HTML content
-            with open(html_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-
-            # Send email
-            success = sender.send_email(
-                to_emails=recipient_email,
-                subject=f"Polymarket Positions Report - {address[:8]}...",
-                body_html=html_content,
-                body_text="Please view this email in HTML format for the best experience."
-            )
-
-            if success:
+            from mail_queue import delivery_outcome
+
+            subject = f"Polymarket Positions Report - {address[:8]}..."
+            body_text = "Please view this email in HTML format for the best experience."
+
+            with nullcontext(sender) if sender is not None else GmailSender() as mailer:
+                # Send email; a list of recipients gets one individual email each
+                if isinstance(recipient_email, (list, tuple)) and len(recipient_email) > 1:
+                    result = mailer.send_bulk(
+                        to_emails=list(recipient_email),
+                        subject=subject,
+                        body_html=html_content,
+                        body_text=body_text
+                    )
+                else:
+                    result = mailer.send_email(
+                        to_emails=recipient_email,
+                        subject=subject,
+                        body_html=html_content,
+                        body_text=body_text
+                    )
+            success = delivery_outcome(result)
+
+            if isinstance(success, Future):
+                print(f"Email to {recipient_email} queued")
+                if state is not None:
+                    def _record_delivery(future: Future):
+                        if future.result():
+                            state.record(address, fingerprint, kind="email")
+                    success.add_done_callback(_record_delivery)
+            elif success:
                 print(f"Email sent successfully to {recipient_email}")
+                if state is not None:
+                    state.record(address, fingerprint, kind="email")
             else:
                 print("Failed to send email")
 
@@ -642,11 +555,16 @@ if __name__ == "__main__":
     print(f"GMAIL_APP_PASSWORD configured: {'Yes' if os.getenv('GMAIL_APP_PASSWORD') else 'No'}")
 
     # Default address
-    address = "0x22633134dc34f6c9a3bff51a0926c9d209714e26"
+    addresses = ["0x22633134dc34f6c9a3bff51a0926c9d209714e26"]
 
-    # Check command line arguments
-    if len(sys.argv) > 1 and not sys.argv[1].startswith("-"):
-        address = sys.argv[1]
+    # Check command line arguments: any leading non-flag arguments are addresses
+    leading = []
+    for arg in sys.argv[1:]:
+        if arg.startswith("-"):
+            break
+        leading.append(arg)
+    if leading:
+        addresses = list(dict.fromkeys(leading))
 
     # Check if email sending is requested
     # In Railway, default to NOT sending email unless explicitly requested
@@ -662,6 +580,12 @@ if __name__ == "__main__":
 
     recipient = None
 
+    # Skip rendering and sending when positions have not changed since the last run
+    skip_unchanged = "--skip-unchanged" in sys.argv
+
+    # Keep reports in memory only (e.g. emailing from an ephemeral container)
+    no_file = "--no-file" in sys.argv
+
     if send_email:
         # Look for email after --send-email or -e flag
         for i, arg in enumerate(sys.argv):
@@ -673,13 +597,49 @@ if __name__ == "__main__":
             print("Please provide recipient email: python create_html.py [address] --send-email recipient@example.com")
             sys.exit(1)
 
+        # A comma-separated list sends each recipient their own copy
+        if "," in recipient:
+            recipient = [r.strip() for r in recipient.split(",") if r.strip()]
+
     # Create and optionally send report
     try:
-        out, email_sent = create_and_send_report(
-            address=address,
-            recipient_email=recipient,
-            send_email=send_email
-        )
+        import asyncio
+        from batch_fetch import iter_wallet_positions
+
+        sender = None
+        if send_email and recipient:
+            from gmail_sender import GmailSender
+            try:
+                # One pool for every wallet in this run
+                sender = GmailSender()
+            except ValueError:
+                pass  # create_and_send_report reports the configuration error
+
+        async def _run_all():
+            email_sent = None
+            async for result in iter_wallet_positions(addresses, fetch=get_user_positions):
+                if not result.ok:
+                    print(f"Error fetching {result.address}: {str(result.error)}")
+                    continue
+                html_path = None if no_file else report_path_for(result.address, len(addresses) > 1)
+                _, sent = create_and_send_report(
+                    address=result.address,
+                    recipient_email=recipient,
+                    send_email=send_email,
+                    html_path=html_path,
+                    df=result.positions,
+                    skip_unchanged=skip_unchanged,
+                    sender=sender
+                )
+                if sent is False:
+                    email_sent = False
+            return email_sent
+
+        try:
+            email_sent = asyncio.run(_run_all())
+        finally:
+            if sender is not None:
+                sender.close()
 
         if email_sent is False:
             print("\nFailed to send email. Check configuration:")
@@ -6,13 +6,14 @@ import smtplib
 import ssl
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-from typing import List, Optional, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from pathlib import Path
 import logging
 
 from smtp_config import SMTPConfig
+from smtp_pool import SMTPConnectionPool
+from mime_stream import StreamedAttachment
+from mail_transport import MailAPIError, MailTransport, SMTPTransport, transport_from_env
 
 
 logging.basicConfig(level=logging.INFO)
@@ -20,12 +21,37 @@ logger = logging.getLogger(__name__)
 
 
 class GmailSender:
-    """Gmail SMTP email sender with attachment support"""
+    """
+    Email sender with attachment support
 
-    def __init__(self, config: Optional[SMTPConfig] = None):
+    Messages are delivered by a `MailTransport`: pooled SMTP by default, or
+    the HTTP email API when MAIL_TRANSPORT=http.
+    """
+
+    def __init__(
+        self,
+        config: Optional[SMTPConfig] = None,
+        pool: Optional[SMTPConnectionPool] = None,
+        transport: Optional[MailTransport] = None
+    ):
         """Initialize with SMTP configuration"""
         self.config = config or SMTPConfig.from_env()
-        self.config.validate()
+        if transport is None:
+            transport = SMTPTransport(self.config, pool) if pool is not None else transport_from_env(self.config)
+        self.transport = transport
+        # The app password is only needed to log in over SMTP
+        self.config.validate(require_password=isinstance(transport, SMTPTransport))
+        self.pool = getattr(transport, 'pool', None)
+
+    def close(self) -> None:
+        """Close pooled connections"""
+        self.transport.close()
+
+    def __enter__(self) -> 'GmailSender':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
 
     def send_email(
         self,
@@ -55,49 +81,16 @@ class GmailSender:
             True if email sent successfully, False otherwise
         """
         try:
-            # Convert single email to list
-            if isinstance(to_emails, str):
-                to_emails = [to_emails]
-            if isinstance(cc_emails, str):
-                cc_emails = [cc_emails]
-            if isinstance(bcc_emails, str):
-                bcc_emails = [bcc_emails]
-
-            # Create message
-            message = MIMEMultipart('alternative')
-            message['Subject'] = subject
-            message['From'] = f"{self.config.sender_name or 'Polymarket Analysis'} <{self.config.sender_email}>"
-            message['To'] = ', '.join(to_emails)
-
-            if cc_emails:
-                message['Cc'] = ', '.join(cc_emails)
-            if reply_to:
-                message['Reply-To'] = reply_to
-
-            # Add text and HTML parts
-            if body_text:
-                text_part = MIMEText(body_text, 'plain', 'utf-8')
-                message.attach(text_part)
-
-            if body_html:
-                html_part = MIMEText(body_html, 'html', 'utf-8')
-                message.attach(html_part)
-            elif not body_text:
-                # If no content provided, add default text
-                text_part = MIMEText('(No content)', 'plain', 'utf-8')
-                message.attach(text_part)
-
-            # Add attachments
-            if attachments:
-                for file_path in attachments:
-                    self._attach_file(message, file_path)
-
-            # Combine all recipients
-            all_recipients = list(to_emails)
-            if cc_emails:
-                all_recipients.extend(cc_emails)
-            if bcc_emails:
-                all_recipients.extend(bcc_emails)
+            message, all_recipients = self.build_message(
+                to_emails=to_emails,
+                subject=subject,
+                body_text=body_text,
+                body_html=body_html,
+                attachments=attachments,
+                cc_emails=cc_emails,
+                bcc_emails=bcc_emails,
+                reply_to=reply_to
+            )
 
             # Send email
             return self._send_message(message, all_recipients)
@@ -106,19 +99,140 @@ class GmailSender:
             logger.error(f"Failed to send email: {str(e)}")
             return False
 
+    def build_message(
+        self,
+        to_emails: Union[str, List[str]],
+        subject: str,
+        body_text: Optional[str] = None,
+        body_html: Optional[str] = None,
+        attachments: Optional[List[str]] = None,
+        cc_emails: Optional[Union[str, List[str]]] = None,
+        bcc_emails: Optional[Union[str, List[str]]] = None,
+        reply_to: Optional[str] = None
+    ) -> Tuple[MIMEMultipart, List[str]]:
+        """
+        Build the MIME message without sending it
+
+        Returns:
+            The message and the full envelope recipient list (To, Cc and Bcc)
+        """
+        # Convert single email to list
+        if isinstance(to_emails, str):
+            to_emails = [to_emails]
+        if isinstance(cc_emails, str):
+            cc_emails = [cc_emails]
+        if isinstance(bcc_emails, str):
+            bcc_emails = [bcc_emails]
+
+        # Create message
+        message = MIMEMultipart('alternative')
+        message['Subject'] = subject
+        message['From'] = self.from_header
+        message['To'] = ', '.join(to_emails)
+
+        if cc_emails:
+            message['Cc'] = ', '.join(cc_emails)
+        if reply_to:
+            message['Reply-To'] = reply_to
+
+        # Add text and HTML parts
+        if body_text:
+            text_part = MIMEText(body_text, 'plain', 'utf-8')
+            message.attach(text_part)
+
+        if body_html:
+            html_part = MIMEText(body_html, 'html', 'utf-8')
+            message.attach(html_part)
+        elif not body_text:
+            # If no content provided, add default text
+            text_part = MIMEText('(No content)', 'plain', 'utf-8')
+            message.attach(text_part)
+
+        # Add attachments
+        if attachments:
+            for file_path in attachments:
+                self._attach_file(message, file_path)
+
+        # Combine all recipients
+        all_recipients = list(to_emails)
+        if cc_emails:
+            all_recipients.extend(cc_emails)
+        if bcc_emails:
+            all_recipients.extend(bcc_emails)
+
+        return message, all_recipients
+
+    @property
+    def from_header(self) -> str:
+        return f"{self.config.sender_name or 'Polymarket Analysis'} <{self.config.sender_email}>"
+
+    def send_bulk(
+        self,
+        to_emails: List[str],
+        subject: Union[str, Callable[[str], str]],
+        body_text: Optional[str] = None,
+        body_html: Optional[str] = None,
+        attachments: Optional[List[str]] = None,
+        reply_to: Optional[str] = None
+    ) -> Dict[str, bool]:
+        """
+        Send the same message to many recipients, one email each
+
+        The MIME body (including the encoded HTML and attachments) is built
+        and serialized once, so attachments are held in memory here, unlike
+        in `send_email`. Each recipient only gets its own To and Subject;
+        over SMTP those header lines are sent ahead of the shared bytes, and
+        the HTTP transport sends all copies through its batch endpoint.
+
+        Args:
+            to_emails: Recipients, each receiving an individual email
+            subject: Subject, or a function of the recipient returning one
+            body_text: Plain text body
+            body_html: HTML body
+            attachments: List of file paths to attach
+            reply_to: Reply-to address
+
+        Returns:
+            Success flag per recipient
+        """
+        try:
+            message, _ = self.build_message(
+                to_emails=[],
+                subject="",
+                body_text=body_text,
+                body_html=body_html,
+                attachments=attachments,
+                reply_to=reply_to
+            )
+            del message['To']
+            del message['Subject']
+            personalizations = [
+                (recipient, subject(recipient) if callable(subject) else subject)
+                for recipient in to_emails
+            ]
+            results = self.transport.send_personalized(self.config.sender_email, message, personalizations)
+        except Exception as e:
+            logger.error(f"Failed to send bulk email: {str(e)}")
+            return {recipient: False for recipient in to_emails}
+
+        sent = sum(results.values())
+        logger.info(f"Bulk email sent to {sent}/{len(to_emails)} recipients")
+        return results
+
     def _attach_file(self, message: MIMEMultipart, file_path: str) -> None:
-        """Attach a file to the email message"""
+        """
+        Attach a file to the email message
+
+        The file is not read here: it is base64-encoded in chunks while the
+        message is being sent.
+        """
         path = Path(file_path)
         if not path.exists():
             logger.warning(f"Attachment file not found: {file_path}")
             return
 
         try:
-            with open(path, 'rb') as file:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(file.read())
-
-            encoders.encode_base64(part)
+            part = StreamedAttachment(path)
             part.add_header(
                 'Content-Disposition',
                 f'attachment; filename= {path.name}'
@@ -130,56 +244,42 @@ class GmailSender:
             logger.error(f"Failed to attach file {file_path}: {str(e)}")
 
     def _send_message(self, message: MIMEMultipart, recipients: List[str]) -> bool:
-        """Send the email message via SMTP"""
+        """Send the email message via the configured transport"""
         import socket
         import os
 
         # Check if running in Railway with network restrictions
-        if os.getenv('RAILWAY_ENVIRONMENT'):
+        if os.getenv('RAILWAY_ENVIRONMENT') and isinstance(self.transport, SMTPTransport):
             logger.warning("Running in Railway environment - SMTP may be restricted")
             logger.warning("Railway's free tier blocks outbound SMTP connections (port 587/465)")
-            logger.warning("Consider upgrading to Railway's paid tier or using an email API service instead")
-
-        context = ssl.create_default_context()
+            logger.warning("Consider upgrading to Railway's paid tier or setting MAIL_TRANSPORT=http")
 
         try:
-            # Test network connectivity first
-            socket.create_connection((self.config.smtp_server, self.config.smtp_port), timeout=5)
-
-            with smtplib.SMTP(self.config.smtp_server, self.config.smtp_port) as server:
-                server.set_debuglevel(0)  # Set to 1 for debugging
-
-                if self.config.use_tls:
-                    server.starttls(context=context)
-
-                server.login(self.config.sender_email, self.config.sender_password)
-
-                text = message.as_string()
-                server.sendmail(
-                    self.config.sender_email,
-                    recipients,
-                    text
-                )
+            self.transport.send(self.config.sender_email, recipients, message)
 
             logger.info(f"Email sent successfully to {', '.join(recipients)}")
             return True
 
+        # SMTP errors subclass OSError, so they must be handled before socket.error
+        except smtplib.SMTPAuthenticationError:
+            logger.error("SMTP Authentication failed. Check your email and app password.")
+            return False
+        except smtplib.SMTPException as e:
+            logger.error(f"SMTP error: {str(e)}")
+            return False
+        except MailAPIError as e:
+            logger.error(f"Email API error: {str(e)}")
+            return False
         except socket.error as e:
             if "Network is unreachable" in str(e) or e.errno == 101:
                 logger.error("Network is unreachable - SMTP ports may be blocked")
                 logger.error("If running on Railway free tier, SMTP is blocked. Solutions:")
                 logger.error("1. Upgrade to Railway paid tier (Team plan or higher)")
-                logger.error("2. Use an email API service (SendGrid, Mailgun, etc.)")
+                logger.error("2. Use the email API transport (MAIL_TRANSPORT=http, EMAIL_API_KEY)")
                 logger.error("3. Run the script locally instead")
             else:
                 logger.error(f"Network error: {str(e)}")
             return False
-        except smtplib.SMTPAuthenticationError:
-            logger.error("SMTP Authentication failed. Check your email and app password.")
-            return False
-        except smtplib.SMTPException as e:
-            logger.error(f"SMTP error: {str(e)}")
-            return False
         except Exception as e:
             logger.error(f"Unexpected error sending email: {str(e)}")
             return False
@@ -0,0 +1,207 @@
+"""
+HTTP Response Cache
+On-disk JSON response cache with per-endpoint TTL, LRU eviction and
+ETag / If-Modified-Since revalidation
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+import logging
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+# Freshness per endpoint path, in seconds
+DEFAULT_TTLS: Dict[str, float] = {
+    "/positions": 60,
+    "/trades": 30,
+    "/value": 60,
+    "/markets": 3600,
+    "/prices-history": 300,
+}
+
+
+@dataclass
+class CacheConfig:
+    """Configuration for the on-disk response cache"""
+    enabled: bool = True
+    directory: str = ".polymarket_cache/http"
+    max_bytes: int = 256 * 1024 * 1024
+    default_ttl: float = 60
+    ttls: Dict[str, float] = field(default_factory=lambda: dict(DEFAULT_TTLS))
+    stale_while_revalidate: bool = False
+    max_stale: float = 24 * 3600  # never serve anything older than this
+
+    @classmethod
+    def from_env(cls) -> 'CacheConfig':
+        """Load configuration from environment variables"""
+        return cls(
+            enabled=os.getenv('POLYMARKET_CACHE', 'True').lower() == 'true',
+            directory=os.getenv('POLYMARKET_CACHE_DIR', '.polymarket_cache/http'),
+            max_bytes=int(float(os.getenv('POLYMARKET_CACHE_MAX_MB', '256')) * 1024 * 1024),
+            default_ttl=float(os.getenv('POLYMARKET_CACHE_TTL', '60')),
+            stale_while_revalidate=os.getenv('POLYMARKET_CACHE_SWR', 'False').lower() == 'true',
+        )
+
+
+class HTTPCache:
+    """Disk-backed cache for JSON GET requests, keyed by URL and params"""
+
+    def __init__(self, config: Optional[CacheConfig] = None):
+        self.config = config or CacheConfig.from_env()
+        self.directory = Path(self.config.directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._revalidating = set()
+        self._background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-revalidate")
+        self._total_bytes = sum(p.stat().st_size for p in self.directory.glob("*.json"))
+
+    # ---- keys and freshness ----
+    @staticmethod
+    def key(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        canonical = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        path = urlsplit(url).path
+        best = None
+        for prefix in self.config.ttls:
+            if path.startswith(prefix) and (best is None or len(prefix) > len(best)):
+                best = prefix
+        return self.config.ttls[best] if best is not None else self.config.default_ttl
+
+    # ---- storage ----
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Bump mtime so eviction drops the least recently used entries first
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry
+
+    def _store(self, key: str, entry: Dict[str, Any]) -> None:
+        path = self._path(key)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        data = json.dumps(entry).encode("utf-8")
+        with self._lock:
+            old_size = path.stat().st_size if path.exists() else 0
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+            self._total_bytes += len(data) - old_size
+            if self._total_bytes > self.config.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until under 90% of the size budget"""
+        entries = []
+        for p in self.directory.glob("*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.config.max_bytes * 0.9
+        for _, size, p in entries:
+            if total <= target:
+                break
+            try:
+                p.unlink()
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+
+    def clear(self) -> None:
+        with self._lock:
+            for p in self.directory.glob("*.json"):
+                p.unlink(missing_ok=True)
+            self._total_bytes = 0
+
+    # ---- fetching ----
+    def get_json(
+        self,
+        session: requests.Session,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout=None
+    ) -> Any:
+        """
+        Return the JSON body for a GET, serving from cache while fresh
+
+        Expired entries are revalidated with If-None-Match / If-Modified-Since.
+        With stale_while_revalidate enabled, an expired entry is returned at once
+        and refreshed in the background.
+        """
+        key = self.key(url, params)
+        entry = self._load(key)
+        if entry is not None:
+            age = time.time() - entry["stored_at"]
+            if age < self.ttl_for(url):
+                return entry["body"]
+            if self.config.stale_while_revalidate and age < self.config.max_stale:
+                self._revalidate_in_background(session, url, params, timeout, key, entry)
+                return entry["body"]
+        return self._fetch(session, url, params, timeout, key, entry)
+
+    def _fetch(self, session, url, params, timeout, key, entry) -> Any:
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+        if response.status_code == 304 and entry is not None:
+            entry["stored_at"] = time.time()
+            self._store(key, entry)
+            return entry["body"]
+
+        response.raise_for_status()
+        body = response.json()
+        self._store(key, {
+            "url": url,
+            "params": params,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "stored_at": time.time(),
+            "body": body,
+        })
+        return body
+
+    def _revalidate_in_background(self, session, url, params, timeout, key, entry) -> None:
+        with self._lock:
+            if key in self._revalidating:
+                return
+            self._revalidating.add(key)
+
+        def run():
+            try:
+                self._fetch(session, url, params, timeout, key, entry)
+            except Exception as e:
+                logger.warning(f"Background revalidation failed for {url}: {str(e)}")
+            finally:
+                with self._lock:
+                    self._revalidating.discard(key)
+
+        self._background.submit(run)
@@ -0,0 +1,314 @@
+"""
+Notification Digests
+Buffers alert and position-change notifications per recipient, merges each
+recipient's buffer into one report-styled email and caps send rates
+"""
+import heapq
+import html
+import os
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+import logging
+
+import pandas as pd
+
+from position_diff import render_delta_table, summarize_changes
+from rate_limiter import TokenBucket
+from report_template import REPORT_HEAD, REPORT_TAIL, render_footer
+
+
+logger = logging.getLogger(__name__)
+
+DIGEST_HEAD = (
+    REPORT_HEAD
+    .replace("<title>Polymarket Positions Report</title>", "<title>Polymarket Digest</title>")
+    .replace("<h1>📊 Polymarket Positions Report</h1>", "<h1>📬 Polymarket Digest</h1>")
+)
+
+_SECTION = (
+    '        <!-- {kind} -->\n'
+    '        <div class="stats-bar">\n'
+    '            <div class="stat-label">{when}</div>\n'
+    '            <div class="stat-value" style="font-size: 18px;">{title}</div>\n'
+    '        </div>\n'
+    '        <div style="padding: 0 20px 20px;">\n'
+    '{body}\n'
+    '        </div>\n'
+    '\n'
+)
+
+
+@dataclass
+class Notification:
+    """One buffered notification: a headline plus HTML and plain-text bodies"""
+    kind: str
+    title: str
+    html: str
+    text: str
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class DigestConfig:
+    """Coalescing window and send rate caps"""
+    window: float = 300.0                   # seconds a recipient's first notification waits for company
+    max_items: int = 50                     # send early once this many notifications are buffered
+    recipient_per_hour: float = 4.0         # digests per recipient per hour
+    recipient_burst: float = 2.0
+    global_per_hour: float = 60.0           # digests per hour over all recipients
+    global_burst: float = 10.0
+    retry_delay: float = 300.0              # seconds before re-sending a digest the sender rejected
+
+    @classmethod
+    def from_env(cls) -> 'DigestConfig':
+        """Load configuration from environment variables"""
+        return cls(
+            window=float(os.getenv('DIGEST_WINDOW', str(cls.window))),
+            max_items=int(os.getenv('DIGEST_MAX_ITEMS', str(cls.max_items))),
+            recipient_per_hour=float(os.getenv('DIGEST_RECIPIENT_PER_HOUR', str(cls.recipient_per_hour))),
+            recipient_burst=float(os.getenv('DIGEST_RECIPIENT_BURST', str(cls.recipient_burst))),
+            global_per_hour=float(os.getenv('DIGEST_GLOBAL_PER_HOUR', str(cls.global_per_hour))),
+            global_burst=float(os.getenv('DIGEST_GLOBAL_BURST', str(cls.global_burst))),
+            retry_delay=float(os.getenv('DIGEST_RETRY_DELAY', str(cls.retry_delay)))
+        )
+
+
+def delta_notification(address: str, changes: pd.DataFrame) -> Notification:
+    """Notification for the significant position changes of one wallet"""
+    summary = summarize_changes(changes)
+    lines = [
+        f"  {row.change.upper():9} {row.title} ({row.outcome}): ${row.value_cur:,.2f} ({row.value_delta:+,.2f})"
+        for row in changes.itertuples(index=False)
+    ]
+    return Notification(
+        kind="Position changes",
+        title=f"{address[:8]}...: {summary}",
+        html=render_delta_table(changes),
+        text=f"Position changes for {address}: {summary}\n" + "\n".join(lines)
+    )
+
+
+def alerts_notification(alerts: pd.DataFrame) -> Notification:
+    """Notification for rows returned by `AlertEngine.evaluate`"""
+    def fmt(values: pd.Series) -> pd.Series:
+        return values.map(lambda x: "" if pd.isna(x) else f"{float(x):,.4g}")
+
+    market = alerts["title"].fillna("").astype(str).map(html.escape)
+    outcome = alerts["outcome"].fillna("").astype(str).map(html.escape)
+    rows = (
+        '<tr><td><div class="title-text">' + market + '</div> <span class="chip">' + outcome + '</span></td>'
+        + '<td>' + alerts["rule"].astype(str).map(html.escape) + '</td>'
+        + '<td>' + fmt(alerts["previous"]) + '</td>'
+        + '<td><span class="val">' + fmt(alerts["value"]) + '</span></td></tr>'
+    )
+    table = (
+        '<table class="positions-table">'
+        '<thead><tr><th>MARKET</th><th>RULE</th><th>PREVIOUS</th><th>VALUE</th></tr></thead>'
+        '<tbody>' + "\n".join(rows) + '</tbody></table>'
+    )
+    wallets = alerts["wallet"].nunique()
+    return Notification(
+        kind="Alerts",
+        title=f"{len(alerts)} alert(s) across {wallets} wallet(s)",
+        html=table,
+        text="\n".join(
+            f"  {row.wallet[:8]}... {row.title} ({row.outcome}): {row.rule}, now {row.value:g}"
+            for row in alerts.itertuples(index=False)
+        )
+    )
+
+
+def render_digest_html(items: List[Notification]) -> str:
+    """One email with a section per notification, in the report's styling"""
+    sections = "".join(
+        _SECTION.format(
+            kind=html.escape(item.kind),
+            when=html.escape(f"{item.kind} · {pd.Timestamp.fromtimestamp(item.created_at):%b %d, %I:%M %p}"),
+            title=html.escape(item.title),
+            body=item.html
+        )
+        for item in items
+    )
+    return DIGEST_HEAD + sections + render_footer() + REPORT_TAIL
+
+
+def render_digest_text(items: List[Notification]) -> str:
+    return "\n\n".join(f"{item.kind}: {item.title}\n{item.text}" for item in items)
+
+
+def digest_subject(items: List[Notification]) -> str:
+    if len(items) == 1:
+        return f"Polymarket {items[0].kind.lower()} - {items[0].title}"
+    kinds = pd.Series([item.kind.lower() for item in items]).value_counts()
+    return f"Polymarket digest: {len(items)} updates (" + ", ".join(f"{n} {k}" for k, n in kinds.items()) + ")"
+
+
+class DigestMailer:
+    """
+    Coalesces notifications per recipient
+
+    A recipient's first notification opens a window of `config.window`
+    seconds; everything arriving for them meanwhile goes into the same
+    email. When the window closes the digest is sent only if both the
+    recipient's and the global token bucket have a token, otherwise it keeps
+    collecting until they do. `sender` is a `GmailSender` or a `MailQueue`.
+    """
+
+    def __init__(self, sender=None, config: Optional[DigestConfig] = None):
+        if sender is None:
+            from gmail_sender import GmailSender
+            sender = GmailSender()
+        self.sender = sender
+        self.config = config or DigestConfig.from_env()
+        self.global_bucket = TokenBucket(self.config.global_per_hour / 3600.0, self.config.global_burst)
+        self._recipient_buckets: Dict[str, TokenBucket] = {}
+
+        self._buffers: Dict[str, List[Notification]] = {}
+        self._due: List[Tuple[float, str]] = []
+        self._due_at: Dict[str, float] = {}
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = threading.Thread(target=self._worker, name="mail-digest", daemon=True)
+        self._thread.start()
+
+    def _bucket(self, recipient: str) -> TokenBucket:
+        bucket = self._recipient_buckets.get(recipient)
+        if bucket is None:
+            bucket = self._recipient_buckets[recipient] = TokenBucket(
+                self.config.recipient_per_hour / 3600.0, self.config.recipient_burst
+            )
+        return bucket
+
+    def _schedule(self, recipient: str, due_at: float) -> None:
+        self._due_at[recipient] = due_at
+        heapq.heappush(self._due, (due_at, recipient))
+
+    # ---- public API ----
+    def notify(self, recipients: Union[str, List[str]], notification: Notification) -> None:
+        """Buffer a notification for each recipient"""
+        recipients = [recipients] if isinstance(recipients, str) else recipients
+        now = time.time()
+        with self._cond:
+            for recipient in recipients:
+                recipient = recipient.strip().lower()
+                buffer = self._buffers.setdefault(recipient, [])
+                if not buffer:
+                    self._schedule(recipient, now + self.config.window)
+                buffer.append(notification)
+                if len(buffer) >= self.config.max_items:
+                    self._schedule(recipient, now)
+            self._cond.notify()
+
+    def pending(self) -> Dict[str, int]:
+        """Buffered notification count per recipient"""
+        with self._cond:
+            return {recipient: len(items) for recipient, items in self._buffers.items() if items}
+
+    def flush(self) -> None:
+        """Send every buffered digest now, ignoring the window and rate caps"""
+        with self._cond:
+            batches = [(recipient, self._buffers.pop(recipient)) for recipient in list(self._buffers)]
+            self._due = []
+            self._due_at = {}
+        for recipient, items in batches:
+            if items:
+                self._bucket(recipient).reserve()
+                self.global_bucket.reserve()
+                self._send(recipient, items)
+
+    def close(self, flush: bool = True) -> None:
+        """Stop the worker; buffered notifications are sent unless `flush` is False"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        self._thread.join()
+        if flush:
+            self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # ---- worker ----
+    def _next_batch(self) -> Optional[Tuple[str, List[Notification]]]:
+        with self._cond:
+            while not self._stopping:
+                if not self._due:
+                    self._cond.wait()
+                    continue
+                due_at, recipient = self._due[0]
+                wait = due_at - time.time()
+                if wait > 0:
+                    self._cond.wait(wait)
+                    continue
+                heapq.heappop(self._due)
+                if self._due_at.get(recipient) != due_at:
+                    continue    # superseded by a later entry for the same recipient
+
+                # This thread is the only consumer, so checking both buckets
+                # before taking from either cannot race
+                bucket = self._bucket(recipient)
+                wait = max(bucket.wait_time(), self.global_bucket.wait_time())
+                if wait > 0:
+                    logger.info(f"Digest for {recipient} rate limited; holding {len(self._buffers[recipient])} item(s) for {wait:.0f}s")
+                    self._schedule(recipient, time.time() + wait)
+                    continue
+                del self._due_at[recipient]
+                bucket.reserve()
+                self.global_bucket.reserve()
+                return recipient, self._buffers.pop(recipient)
+            return None
+
+    def _worker(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            recipient, items = batch
+            try:
+                sent = self._send(recipient, items)
+            except Exception as e:
+                logger.error(f"Digest for {recipient} failed: {str(e)}")
+                sent = False
+            if not sent:
+                # Put the items back in front of anything that arrived meanwhile
+                with self._cond:
+                    buffer = self._buffers.setdefault(recipient, [])
+                    if not buffer:
+                        self._schedule(recipient, time.time() + self.config.retry_delay)
+                    buffer[:0] = items
+
+    def _send(self, recipient: str, items: List[Notification]) -> bool:
+        result = self.sender.send_email(
+            to_emails=recipient,
+            subject=digest_subject(items),
+            body_text=render_digest_text(items),
+            body_html=render_digest_html(items)
+        )
+        if isinstance(result, Future):
+            # MailQueue: the message is durable in the outbox and retried there
+            return True
+        logger.info(f"Digest of {len(items)} notification(s) to {recipient}: {'sent' if result else 'failed'}")
+        return bool(result)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2:
+        print("Usage: python mail_digest.py <recipient> [message ...]")
+        sys.exit(1)
+
+    config = DigestConfig.from_env()
+    with DigestMailer(config=config) as digest:
+        for text in sys.argv[2:] or ["Test notification"]:
+            digest.notify(sys.argv[1], Notification(
+                kind="Message", title=text, html=f"<p>{html.escape(text)}</p>", text=text
+            ))
+        print(f"Buffered {sum(digest.pending().values())} notification(s); sending on exit")
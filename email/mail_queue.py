@@ -0,0 +1,304 @@
+"""
+Outbound Mail Queue
+Durable on-disk outbox drained by background worker threads through the sender's
+mail transport, with retry/backoff and a dead-letter directory
+"""
+import heapq
+import json
+import os
+import smtplib
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from email.message import Message
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import logging
+
+from gmail_sender import GmailSender
+from mail_transport import MailAPIError
+from mime_stream import iter_message_bytes
+from rate_limiter import backoff_delay
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OUTBOX_DIR = ".polymarket_cache/outbox"
+
+
+class PermanentDeliveryError(Exception):
+    """The server rejected the message in a way retrying will not fix"""
+
+
+def _is_permanent(error: Exception) -> bool:
+    # 5xx replies to MAIL/RCPT/DATA are permanent; 4xx and dropped connections are not
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, (smtplib.SMTPSenderRefused, smtplib.SMTPDataError)):
+        return error.smtp_code >= 500
+    if isinstance(error, MailAPIError):
+        return error.permanent
+    return False
+
+
+def delivery_outcome(result: Any) -> Union[bool, Future]:
+    """
+    One outcome for what `send_email` or `send_bulk` returned
+
+    A `GmailSender` has already sent, so its flag (or every per-recipient
+    flag) is returned as a bool. A `MailQueue` returns futures; they are
+    combined into one Future resolving to True once every copy is delivered,
+    or to False as soon as all have settled with any of them dead-lettered.
+    """
+    results = list(result.values()) if isinstance(result, dict) else [result]
+    futures = [r for r in results if isinstance(r, Future)]
+    if not futures:
+        return all(bool(r) for r in results)
+
+    combined: Future = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def settle(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        combined.set_result(all(f.exception() is None for f in futures))
+
+    for future in futures:
+        future.add_done_callback(settle)
+    return combined
+
+
+class MailQueue:
+    """
+    Queue-based sender
+
+    `enqueue` writes the message to `<outbox>/pending` and returns a Future at
+    once. Worker threads send due messages; transient failures are retried
+    with jittered exponential backoff, and messages that fail permanently or
+    run out of attempts move to `<outbox>/dead`. Messages left pending by a
+    previous process are picked up again on start.
+    """
+
+    def __init__(
+        self,
+        sender: Optional[GmailSender] = None,
+        outbox_dir: Optional[str] = None,
+        workers: int = 2,
+        max_attempts: int = 5,
+        base_delay: float = 5.0,
+        max_delay: float = 600.0
+    ):
+        self.sender = sender or GmailSender()
+        root = Path(outbox_dir or os.getenv('MAIL_OUTBOX_DIR', DEFAULT_OUTBOX_DIR))
+        self.pending_dir = root / "pending"
+        self.dead_dir = root / "dead"
+        self.pending_dir.mkdir(parents=True, exist_ok=True)
+        self.dead_dir.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._due: List[Tuple[float, str]] = []
+        self._futures: Dict[str, Future] = {}
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stopping = False
+
+        self._recover()
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"mail-queue-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    # ---- outbox files ----
+    def _meta_path(self, message_id: str, directory: Optional[Path] = None) -> Path:
+        return (directory or self.pending_dir) / f"{message_id}.json"
+
+    def _body_path(self, message_id: str, directory: Optional[Path] = None) -> Path:
+        return (directory or self.pending_dir) / f"{message_id}.eml"
+
+    def _write_meta(self, message_id: str, meta: dict) -> None:
+        path = self._meta_path(message_id)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(meta), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _recover(self) -> None:
+        for path in self.pending_dir.glob("*.json"):
+            try:
+                meta = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                self._dead_letter_unreadable(path.stem, e)
+                continue
+            heapq.heappush(self._due, (meta.get("next_attempt_at", 0), path.stem))
+        if self._due:
+            logger.info(f"Recovered {len(self._due)} pending message(s) from {self.pending_dir}")
+
+    # ---- public API ----
+    def enqueue(self, message: Message, recipients: List[str]) -> Future:
+        """Persist a message to the outbox and return a Future resolved once it is sent"""
+        message_id = f"{time.time_ns()}-{uuid.uuid4().hex[:8]}"
+        with open(self._body_path(message_id), 'wb') as f:
+            for chunk in iter_message_bytes(message):
+                f.write(chunk)
+        self._write_meta(message_id, {
+            "recipients": list(recipients),
+            "attempts": 0,
+            "created_at": time.time(),
+            "next_attempt_at": 0,
+            "last_error": None,
+        })
+
+        future: Future = Future()
+        with self._cond:
+            self._futures[message_id] = future
+            heapq.heappush(self._due, (0, message_id))
+            self._cond.notify()
+        return future
+
+    def send_email(self, **kwargs) -> Future:
+        """Non-blocking counterpart of `GmailSender.send_email`, same arguments"""
+        message, recipients = self.sender.build_message(**kwargs)
+        return self.enqueue(message, recipients)
+
+    def send_bulk(
+        self,
+        to_emails: List[str],
+        subject: Union[str, Callable[[str], str]],
+        body_text: Optional[str] = None,
+        body_html: Optional[str] = None,
+        attachments: Optional[List[str]] = None,
+        reply_to: Optional[str] = None
+    ) -> Dict[str, Future]:
+        """Non-blocking counterpart of `GmailSender.send_bulk`: one queued email, and Future, per recipient"""
+        return {
+            recipient: self.send_email(
+                to_emails=recipient,
+                subject=subject(recipient) if callable(subject) else subject,
+                body_text=body_text,
+                body_html=body_html,
+                attachments=attachments,
+                reply_to=reply_to
+            )
+            for recipient in to_emails
+        }
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._due) + self._in_flight
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the outbox is empty; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._due or self._in_flight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, wait: bool = True, timeout: Optional[float] = None) -> None:
+        """Stop the workers, optionally after the outbox drains; unsent messages stay on disk"""
+        if wait:
+            self.join(timeout)
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self.sender.close()
+
+    # ---- workers ----
+    def _next_due(self) -> Optional[str]:
+        with self._cond:
+            while not self._stopping:
+                if self._due:
+                    due_at, message_id = self._due[0]
+                    wait = due_at - time.time()
+                    if wait <= 0:
+                        heapq.heappop(self._due)
+                        self._in_flight += 1
+                        return message_id
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _worker(self) -> None:
+        while True:
+            message_id = self._next_due()
+            if message_id is None:
+                return
+            try:
+                self._attempt(message_id)
+            except Exception as e:
+                logger.error(f"Mail queue worker error on {message_id}: {str(e)}")
+            finally:
+                with self._cond:
+                    self._in_flight -= 1
+                    self._cond.notify_all()
+
+    def _attempt(self, message_id: str) -> None:
+        meta_path = self._meta_path(message_id)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            recipients = list(meta["recipients"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._dead_letter_unreadable(message_id, e)
+            return
+        body_path = self._body_path(message_id)
+
+        try:
+            self.sender.transport.send_file(self.sender.config.sender_email, recipients, body_path)
+        except Exception as e:
+            meta["attempts"] = meta.get("attempts", 0) + 1
+            meta["last_error"] = f"{type(e).__name__}: {str(e)}"
+            if _is_permanent(e) or meta["attempts"] >= self.max_attempts:
+                self._dead_letter(message_id, meta, e)
+                return
+            delay = max(self.base_delay, backoff_delay(meta["attempts"], self.base_delay, self.max_delay))
+            meta["next_attempt_at"] = time.time() + delay
+            self._write_meta(message_id, meta)
+            logger.warning(f"Send of {message_id} failed ({meta['last_error']}), retry {meta['attempts']} in {delay:.0f}s")
+            with self._cond:
+                heapq.heappush(self._due, (meta["next_attempt_at"], message_id))
+                self._cond.notify()
+            return
+
+        self._body_path(message_id).unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+        logger.info(f"Email {message_id} sent to {', '.join(recipients)}")
+        future = self._futures.pop(message_id, None)
+        if future is not None:
+            future.set_result(True)
+
+    def _dead_letter(self, message_id: str, meta: dict, error: Exception) -> None:
+        os.replace(self._body_path(message_id), self._body_path(message_id, self.dead_dir))
+        self._meta_path(message_id, self.dead_dir).write_text(json.dumps(meta), encoding="utf-8")
+        self._meta_path(message_id).unlink(missing_ok=True)
+        logger.error(f"Email {message_id} moved to dead letters after {meta['attempts']} attempt(s): {meta['last_error']}")
+        future = self._futures.pop(message_id, None)
+        if future is not None:
+            future.set_exception(
+                error if not _is_permanent(error) else PermanentDeliveryError(meta["last_error"])
+            )
+
+    def _dead_letter_unreadable(self, message_id: str, error: Exception) -> None:
+        # Without its metadata the message cannot be sent; keep what is left for inspection
+        for path, dead_path in (
+            (self._body_path(message_id), self._body_path(message_id, self.dead_dir)),
+            (self._meta_path(message_id), self._meta_path(message_id, self.dead_dir)),
+        ):
+            if path.exists():
+                os.replace(path, dead_path)
+        logger.error(f"Email {message_id} moved to dead letters: unreadable metadata ({str(error)})")
+        future = self._futures.pop(message_id, None)
+        if future is not None:
+            future.set_exception(PermanentDeliveryError(f"Unreadable outbox metadata: {str(error)}"))
@@ -0,0 +1,348 @@
+"""
+Mail Transports
+Delivery backends behind GmailSender: pooled SMTP, or an HTTP JSON email API
+for hosts that block outbound SMTP (such as Railway's free tier)
+"""
+import base64
+import os
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from email import message_from_binary_file, message_from_bytes
+from email.header import Header, decode_header, make_header
+from email.message import Message
+from email.utils import getaddresses
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from mime_stream import StreamedAttachment, iter_message_bytes, iter_smtp_file
+from rate_limiter import backoff_delay, parse_retry_after
+from smtp_config import SMTPConfig
+from smtp_pool import SMTPConnectionPool, quote_periods
+
+
+logger = logging.getLogger(__name__)
+
+
+class MailAPIError(Exception):
+    """The email API rejected a request or one of the messages in a batch"""
+
+    def __init__(
+        self,
+        message: str,
+        status: Optional[int] = None,
+        error_code: Optional[int] = None,
+        maybe_sent: bool = False
+    ):
+        super().__init__(message)
+        self.status = status
+        self.error_code = error_code
+        self.maybe_sent = maybe_sent
+
+    @property
+    def permanent(self) -> bool:
+        # A per-message error code or a 4xx other than 429 will not go away on retry;
+        # a request that may have been accepted must not be sent again
+        if self.error_code is not None or self.maybe_sent:
+            return True
+        return self.status is not None and 400 <= self.status < 500 and self.status != 429
+
+
+class MailTransport(ABC):
+    """Delivers serialized MIME messages"""
+
+    @abstractmethod
+    def send(self, from_addr: str, recipients: List[str], message: Message) -> Dict[str, Any]:
+        """Send one message; returns the recipients that were refused"""
+
+    def send_personalized(
+        self,
+        from_addr: str,
+        message: Message,
+        personalizations: List[Tuple[str, str]]
+    ) -> Dict[str, bool]:
+        """
+        Send one copy of `message` per (recipient, subject) pair
+
+        `message` has no To or Subject header; each copy gets its own.
+        Returns a success flag per recipient.
+        """
+        results = {}
+        for recipient, subject in personalizations:
+            copy = message_from_bytes(b"".join(iter_message_bytes(message)))
+            copy['To'] = recipient
+            copy['Subject'] = subject
+            try:
+                refused = self.send(from_addr, [recipient], copy)
+                results[recipient] = recipient not in refused
+            except Exception as e:
+                logger.error(f"Failed to send email to {recipient}: {str(e)}")
+                results[recipient] = False
+        return results
+
+    def send_file(self, from_addr: str, recipients: List[str], path: Path) -> Dict[str, Any]:
+        """Send a message serialized to disk, e.g. from the mail queue's outbox"""
+        with open(path, 'rb') as f:
+            message = message_from_binary_file(f)
+        return self.send(from_addr, recipients, message)
+
+    def close(self) -> None:
+        pass
+
+
+class SMTPTransport(MailTransport):
+    """SMTP over a pool of authenticated connections"""
+
+    def __init__(self, config: SMTPConfig, pool: Optional[SMTPConnectionPool] = None):
+        self.pool = pool or SMTPConnectionPool(config)
+
+    def send(self, from_addr: str, recipients: List[str], message: Message) -> Dict[str, Any]:
+        # Streamed straight to the socket; attachments are encoded chunk by chunk
+        return self.pool.send_parts(
+            from_addr, recipients, lambda: iter_message_bytes(message, dot_stuff=True)
+        )
+
+    def send_personalized(
+        self,
+        from_addr: str,
+        message: Message,
+        personalizations: List[Tuple[str, str]]
+    ) -> Dict[str, bool]:
+        # Serialize and dot-stuff the shared body once; each recipient only
+        # gets its own To and Subject lines ahead of it
+        shared = b"".join(iter_message_bytes(message, dot_stuff=True))
+        results = {}
+        for recipient, subject in personalizations:
+            headers = quote_periods((
+                f"To: {recipient}\r\n"
+                f"Subject: {Header(subject, 'utf-8').encode()}\r\n"
+            ).encode('utf-8'))
+            try:
+                refused = self.pool.send_parts(from_addr, [recipient], lambda: (headers, shared))
+                results[recipient] = recipient not in refused
+            except Exception as e:
+                logger.error(f"Failed to send email to {recipient}: {str(e)}")
+                results[recipient] = False
+        return results
+
+    def send_file(self, from_addr: str, recipients: List[str], path: Path) -> Dict[str, Any]:
+        return self.pool.send_parts(from_addr, recipients, lambda: iter_smtp_file(path))
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+@dataclass
+class EmailAPIConfig:
+    """
+    Configuration for an HTTP JSON email API
+
+    The defaults follow Postmark's API (`/email` and `/email/batch`, server
+    token header); any provider or local stand-in speaking the same JSON can
+    be used by changing `base_url`.
+    """
+    base_url: str = "https://api.postmarkapp.com"
+    api_key: str = ""
+    auth_header: str = "X-Postmark-Server-Token"
+    send_path: str = "/email"
+    batch_path: str = "/email/batch"
+    max_batch: int = 500
+    timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> 'EmailAPIConfig':
+        """Load configuration from environment variables"""
+        return cls(
+            base_url=os.getenv('EMAIL_API_URL', cls.base_url),
+            api_key=os.getenv('EMAIL_API_KEY', ''),
+            auth_header=os.getenv('EMAIL_API_AUTH_HEADER', cls.auth_header),
+            max_batch=int(os.getenv('EMAIL_API_MAX_BATCH', str(cls.max_batch)))
+        )
+
+    def validate(self) -> bool:
+        if not self.api_key:
+            raise ValueError("EMAIL_API_KEY environment variable is required")
+        return True
+
+
+def _header_text(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return str(make_header(decode_header(str(value))))
+
+
+def message_to_payload(message: Message, recipients: List[str]) -> Dict[str, Any]:
+    """
+    Convert a MIME message to the API's JSON shape
+
+    Envelope recipients missing from To and Cc are sent as Bcc. Attachments
+    have to be inlined as base64 in the JSON body.
+    """
+    payload: Dict[str, Any] = {"From": _header_text(message['From'])}
+    for key, header in (("To", 'To'), ("Cc", 'Cc'), ("ReplyTo", 'Reply-To'), ("Subject", 'Subject')):
+        if message[header] is not None:
+            payload[key] = _header_text(message[header])
+
+    visible = {addr.lower() for _, addr in getaddresses(message.get_all('To', []) + message.get_all('Cc', []))}
+    bcc = [r for r in recipients if r.lower() not in visible]
+    if bcc:
+        payload["Bcc"] = ", ".join(bcc)
+
+    attachments = []
+    for part in message.walk():
+        if part.is_multipart():
+            continue
+        if isinstance(part, StreamedAttachment):
+            attachments.append({
+                "Name": part.path.name,
+                "Content": base64.b64encode(part.path.read_bytes()).decode('ascii'),
+                "ContentType": part.get_content_type(),
+            })
+        elif part.get_content_disposition() == 'attachment':
+            attachments.append({
+                "Name": (part.get_filename() or "attachment").strip(),
+                "Content": base64.b64encode(part.get_payload(decode=True) or b"").decode('ascii'),
+                "ContentType": part.get_content_type(),
+            })
+        elif part.get_content_type() in ('text/plain', 'text/html'):
+            key = "TextBody" if part.get_content_type() == 'text/plain' else "HtmlBody"
+            charset = part.get_content_charset() or 'utf-8'
+            payload[key] = part.get_payload(decode=True).decode(charset, errors='replace')
+    if attachments:
+        payload["Attachments"] = attachments
+    return payload
+
+
+class HTTPEmailTransport(MailTransport):
+    """
+    JSON email API over a keep-alive session
+
+    Personalized sends go through the batch endpoint, up to `max_batch`
+    messages per request. Only requests the API cannot have acted on are
+    retried: 429 responses and failures to connect. Read timeouts and 5xx
+    may come after the messages were accepted, so re-posting them could
+    deliver a batch twice; they surface as errors instead.
+    """
+
+    def __init__(self, config: Optional[EmailAPIConfig] = None, max_retries: int = 3):
+        self.config = config or EmailAPIConfig.from_env()
+        self.config.validate()
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            self.config.auth_header: self.config.api_key,
+        })
+
+    @staticmethod
+    def _not_sent(error: requests.RequestException) -> bool:
+        """True when the request never reached the server"""
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(error, requests.exceptions.ConnectionError):
+            reason = getattr(error.args[0], "reason", None) if error.args else None
+            return isinstance(reason, NewConnectionError)
+        return False
+
+    def _post(self, path: str, body: Any) -> Any:
+        url = self.config.base_url.rstrip('/') + path
+        attempt = 0
+        while True:
+            try:
+                response = self.session.post(url, json=body, timeout=self.config.timeout)
+            except requests.RequestException as e:
+                if not self._not_sent(e) or attempt >= self.max_retries:
+                    raise MailAPIError(f"{path} failed: {str(e)}", maybe_sent=not self._not_sent(e)) from e
+                delay = backoff_delay(attempt)
+                logger.warning(f"Could not connect to email API ({str(e)}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code != 429 or attempt >= self.max_retries:
+                    break
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                response.close()
+                logger.warning(f"Email API rate limited, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+        if response.status_code >= 400:
+            raise MailAPIError(f"{path} returned {response.status_code}: {response.text[:200]}", response.status_code)
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _check(result: Any) -> None:
+        # Postmark reports per-message failures as a non-zero ErrorCode
+        if isinstance(result, dict) and result.get("ErrorCode"):
+            raise MailAPIError(str(result.get("Message") or result), error_code=result.get("ErrorCode"))
+
+    def send(self, from_addr: str, recipients: List[str], message: Message) -> Dict[str, Any]:
+        self._check(self._post(self.config.send_path, message_to_payload(message, recipients)))
+        return {}
+
+    def send_batch(self, payloads: List[Dict[str, Any]]) -> List[Optional[MailAPIError]]:
+        """POST payloads to the batch endpoint in groups; returns the error (or None) per payload"""
+        errors: List[Optional[MailAPIError]] = []
+        for i in range(0, len(payloads), self.config.max_batch):
+            group = payloads[i:i + self.config.max_batch]
+            try:
+                results = self._post(self.config.batch_path, group)
+            except MailAPIError as e:
+                errors.extend([e] * len(group))
+                continue
+            if not isinstance(results, list) or len(results) != len(group):
+                # Results are matched by position; without one per payload none
+                # can be trusted, and the API may still have accepted any of them
+                got = f"{len(results)} result(s)" if isinstance(results, list) else type(results).__name__
+                error = MailAPIError(
+                    f"{self.config.batch_path} answered {got} for {len(group)} message(s)", maybe_sent=True
+                )
+                errors.extend([error] * len(group))
+                continue
+            for result in results:
+                try:
+                    self._check(result)
+                    errors.append(None)
+                except MailAPIError as e:
+                    errors.append(e)
+        return errors
+
+    def send_personalized(
+        self,
+        from_addr: str,
+        message: Message,
+        personalizations: List[Tuple[str, str]]
+    ) -> Dict[str, bool]:
+        # The shared payload is built once; per-recipient dicts only add To and Subject
+        base = message_to_payload(message, [])
+        payloads = [dict(base, To=recipient, Subject=subject) for recipient, subject in personalizations]
+        results = {}
+        for (recipient, _), error in zip(personalizations, self.send_batch(payloads)):
+            if error is not None:
+                logger.error(f"Failed to send email to {recipient}: {str(error)}")
+            results[recipient] = error is None
+        return results
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def transport_from_env(config: SMTPConfig, pool: Optional[SMTPConnectionPool] = None) -> MailTransport:
+    """Pick the transport named by MAIL_TRANSPORT (`smtp`, the default, or `http`)"""
+    kind = os.getenv('MAIL_TRANSPORT', 'smtp').lower()
+    if kind == 'http':
+        return HTTPEmailTransport()
+    if kind != 'smtp':
+        raise ValueError(f"Unknown MAIL_TRANSPORT: {kind}")
+    return SMTPTransport(config, pool)
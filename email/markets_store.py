@@ -0,0 +1,215 @@
+"""
+CLOB Markets Catalog
+Syncs the full CLOB markets catalog into a local SQLite store indexed by
+condition id, token id and slug
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+import pandas as pd
+
+from polymarket_client import CLOB_API, get_json
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = ".polymarket_cache/markets.sqlite"
+
+# The CLOB signals the last page with this cursor
+END_CURSOR = "LTE="
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS markets (
+    condition_id TEXT PRIMARY KEY,
+    question TEXT,
+    market_slug TEXT,
+    icon TEXT,
+    image TEXT,
+    active INTEGER,
+    closed INTEGER,
+    end_date_iso TEXT,
+    content_hash TEXT NOT NULL,
+    raw TEXT NOT NULL,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_markets_slug ON markets (market_slug);
+CREATE TABLE IF NOT EXISTS market_tokens (
+    token_id TEXT PRIMARY KEY,
+    condition_id TEXT NOT NULL,
+    outcome TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_market_tokens_condition ON market_tokens (condition_id);
+"""
+
+
+def _content_hash(market: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(market, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class MarketsStore:
+    """Local copy of the CLOB markets catalog"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = Path(db_path or os.getenv('POLYMARKET_MARKETS_DB', DEFAULT_DB_PATH))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @classmethod
+    def open_existing(cls, db_path: Optional[str] = None) -> Optional['MarketsStore']:
+        """Open the store only if a catalog has already been synced"""
+        path = Path(db_path or os.getenv('POLYMARKET_MARKETS_DB', DEFAULT_DB_PATH))
+        return cls(str(path)) if path.exists() else None
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---- sync ----
+    def _upsert(self, conn: sqlite3.Connection, markets: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO markets
+                (condition_id, question, market_slug, icon, image, active, closed, end_date_iso, content_hash, raw, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [
+                (
+                    m["condition_id"], m.get("question"), m.get("market_slug"), m.get("icon"), m.get("image"),
+                    int(bool(m.get("active"))), int(bool(m.get("closed"))), m.get("end_date_iso"),
+                    _content_hash(m), json.dumps(m), now,
+                )
+                for m in markets
+            ]
+        )
+        conn.executemany(
+            "INSERT OR REPLACE INTO market_tokens (token_id, condition_id, outcome) VALUES (?, ?, ?)",
+            [
+                (str(t["token_id"]), m["condition_id"], t.get("outcome"))
+                for m in markets
+                for t in (m.get("tokens") or [])
+                if t.get("token_id")
+            ]
+        )
+
+    def sync(self, max_pages: Optional[int] = None) -> Dict[str, int]:
+        """
+        Walk the CLOB `next_cursor` pages and store new or changed markets
+
+        Every page is still read, since the CLOB has no modified-since filter,
+        but only markets whose content hash differs from the stored one are
+        written.
+
+        Returns:
+            Counts of markets seen, added and updated
+        """
+        with self._connect() as conn:
+            known = dict(conn.execute("SELECT condition_id, content_hash FROM markets").fetchall())
+
+        stats = {"seen": 0, "added": 0, "updated": 0}
+        cursor = ""
+        pages = 0
+        while cursor != END_CURSOR and (max_pages is None or pages < max_pages):
+            params = {"next_cursor": cursor} if cursor else None
+            page = get_json(f"{CLOB_API}/markets", params=params, use_cache=False)
+            pages += 1
+
+            changed = []
+            for market in page.get("data") or []:
+                condition_id = market.get("condition_id")
+                if not condition_id:
+                    continue
+                stats["seen"] += 1
+                old_hash = known.get(condition_id)
+                if old_hash is None:
+                    stats["added"] += 1
+                elif old_hash != _content_hash(market):
+                    stats["updated"] += 1
+                else:
+                    continue
+                changed.append(market)
+
+            if changed:
+                with self._connect() as conn:
+                    self._upsert(conn, changed)
+
+            cursor = page.get("next_cursor") or END_CURSOR
+
+        logger.info(f"Markets sync: {stats['seen']} seen, {stats['added']} added, {stats['updated']} updated over {pages} pages")
+        return stats
+
+    # ---- lookups ----
+    def _market(self, where: str, value: str) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(f"SELECT raw FROM markets WHERE {where}", (value,)).fetchone()
+        return json.loads(row["raw"]) if row else None
+
+    def by_condition_id(self, condition_id: str) -> Optional[Dict[str, Any]]:
+        return self._market("condition_id = ?", condition_id)
+
+    def by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        return self._market("market_slug = ?", slug)
+
+    def by_token_id(self, token_id: str) -> Optional[Dict[str, Any]]:
+        return self._market(
+            "condition_id = (SELECT condition_id FROM market_tokens WHERE token_id = ?)", str(token_id)
+        )
+
+    def lookup(self, condition_ids: Iterable[str]) -> pd.DataFrame:
+        """Title, slug and icon for a set of condition ids, indexed by condition_id"""
+        ids = list(dict.fromkeys(c for c in condition_ids if isinstance(c, str) and c))
+        frames = []
+        with self._connect() as conn:
+            # Stay under SQLite's bound-parameter limit
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                frames.append(pd.read_sql_query(
+                    f"SELECT condition_id, question, market_slug, icon FROM markets "
+                    f"WHERE condition_id IN ({', '.join('?' * len(chunk))})",
+                    conn, params=chunk
+                ))
+        if not frames:
+            return pd.DataFrame(columns=["question", "market_slug", "icon"]).rename_axis("condition_id")
+        return pd.concat(frames, ignore_index=True).set_index("condition_id")
+
+
+def enrich_positions(df: pd.DataFrame, store: MarketsStore) -> pd.DataFrame:
+    """
+    Fill missing title, marketSlug and icon columns of a positions frame
+    from the local catalog; values already in the payload are kept
+    """
+    if df.empty or "conditionId" not in df.columns:
+        return df
+
+    meta = store.lookup(df["conditionId"])
+    if meta.empty:
+        return df
+
+    for target, source in (("title", "question"), ("marketSlug", "market_slug"), ("icon", "icon")):
+        looked_up = df["conditionId"].map(meta[source])
+        if target in df.columns:
+            missing = (df[target].isna() | (df[target] == "")) & looked_up.notna()
+            df.loc[missing, target] = looked_up[missing]
+        else:
+            df[target] = looked_up
+    return df
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(MarketsStore().sync())
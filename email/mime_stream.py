@@ -0,0 +1,104 @@
+"""
+Streaming MIME Serialization
+Attachments are base64-encoded from disk chunk by chunk while a message is
+written out, so large exports are never held in memory
+"""
+import base64
+import re
+import uuid
+from email.message import Message
+from email.mime.base import MIMEBase
+from pathlib import Path
+from typing import Iterator, Union
+
+from smtp_pool import quote_periods
+
+
+# Raw bytes read per chunk; a multiple of 57 so every chunk encodes to whole
+# 76-character base64 lines
+ATTACHMENT_CHUNK_BYTES = 57 * 16 * 1024
+
+_BARE_LF = re.compile(rb'(?<!\r)\n')
+
+
+class StreamedAttachment(MIMEBase):
+    """
+    Attachment whose body is read from `path` only when the message is
+    serialized with `iter_message_bytes`
+
+    Until then its payload is a unique placeholder, so the regular
+    `as_string`/`as_bytes` must not be used on messages containing one.
+    """
+
+    def __init__(self, path: Union[str, Path], maintype: str = 'application', subtype: str = 'octet-stream'):
+        super().__init__(maintype, subtype)
+        self.path = Path(path)
+        self.placeholder = f"streamed-attachment-{uuid.uuid4().hex}"
+        self['Content-Transfer-Encoding'] = 'base64'
+        self.set_payload(self.placeholder)
+
+
+def iter_base64_lines(path: Union[str, Path], chunk_size: int = ATTACHMENT_CHUNK_BYTES) -> Iterator[bytes]:
+    """Base64 of a file as CRLF-terminated 76-character lines, one chunk at a time"""
+    with open(path, 'rb') as f:
+        while True:
+            raw = f.read(chunk_size)
+            if not raw:
+                return
+            encoded = base64.b64encode(raw)
+            yield b"\r\n".join(encoded[i:i + 76] for i in range(0, len(encoded), 76)) + b"\r\n"
+
+
+def iter_message_bytes(
+    message: Message,
+    dot_stuff: bool = False,
+    chunk_size: int = ATTACHMENT_CHUNK_BYTES
+) -> Iterator[bytes]:
+    """
+    Serialize a message as CRLF bytes, streaming any `StreamedAttachment` bodies
+
+    With `dot_stuff`, the output is ready to be written to an SMTP DATA
+    command (base64 lines never start with a dot, so only the rest of the
+    message needs stuffing).
+    """
+    prepare = quote_periods if dot_stuff else (lambda data: data)
+    streamed = {
+        part.placeholder.encode('ascii'): part
+        for part in message.walk()
+        if isinstance(part, StreamedAttachment)
+    }
+    skeleton = message.as_bytes(policy=message.policy.clone(linesep='\r\n'))
+    if not streamed:
+        yield prepare(skeleton)
+        return
+
+    pattern = re.compile(b"(" + b"|".join(re.escape(key) for key in streamed) + b")\r\n")
+    position = 0
+    for match in pattern.finditer(skeleton):
+        yield prepare(skeleton[position:match.start()])
+        yield from iter_base64_lines(streamed[match.group(1)].path, chunk_size)
+        position = match.end()
+    yield prepare(skeleton[position:])
+
+
+def iter_smtp_file(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> Iterator[bytes]:
+    """
+    Stream a serialized message file as dot-stuffed CRLF parts for SMTP DATA
+
+    Each part ends on a line boundary; bare LF line endings are converted.
+    """
+    carry = b""
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            data = carry + chunk
+            cut = data.rfind(b"\n") + 1
+            if cut == 0:
+                carry = data
+                continue
+            carry = data[cut:]
+            yield quote_periods(_BARE_LF.sub(b"\r\n", data[:cut]))
+    if carry:
+        yield quote_periods(_BARE_LF.sub(b"\r\n", carry))
@@ -0,0 +1,237 @@
+"""
+Polymarket API Client
+Pooled HTTP session and paginated fetchers for the Polymarket data-api and CLOB
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import logging
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import CacheConfig, HTTPCache
+from rate_limiter import RateLimiter, backoff_delay, get_rate_limiter, parse_retry_after
+
+
+logger = logging.getLogger(__name__)
+
+# Central Limit Order Book API
+CLOB_API = "https://clob.polymarket.com"
+
+# Data API
+DATA_API = "https://data-api.polymarket.com"
+
+HEADERS = {"User-Agent": "polymarket-analysis/1.0"}
+
+# (connect, read) timeout in seconds
+DEFAULT_TIMEOUT = (5, 30)
+
+# The positions endpoint caps `limit` at 500
+POSITIONS_PAGE_SIZE = 500
+
+# Pages of one wallet's positions fetched concurrently
+POSITIONS_PAGE_WORKERS = 4
+
+# Keep-alive connections kept per host; batch callers grow it to their concurrency
+DEFAULT_POOL_SIZE = 16
+
+# Responses worth retrying after a backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session: Optional[requests.Session] = None
+_pool_size = 0
+_session_lock = threading.Lock()
+_cache: Optional[HTTPCache] = None
+_cache_loaded = False
+
+
+class RateLimitedSession(requests.Session):
+    """
+    Session that waits on the shared per-host token bucket before every request
+    and retries 429/5xx responses and connection errors with jittered
+    exponential backoff, honoring Retry-After when the server sends it
+    """
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, max_retries: int = 5):
+        super().__init__()
+        self.limiter = limiter or get_rate_limiter()
+        self.max_retries = max_retries
+
+    def request(self, method, url, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.limiter.acquire(url)
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.warning(f"{method} {url} failed ({str(e)}), retrying in {delay:.1f}s")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                delay = retry_after if retry_after is not None else backoff_delay(attempt)
+                if response.status_code == 429:
+                    # Hold back every caller of this host, not just this one
+                    self.limiter.pause(url, delay)
+                response.close()
+                logger.warning(f"{method} {url} returned {response.status_code}, retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+
+def get_session(pool_size: int = DEFAULT_POOL_SIZE) -> requests.Session:
+    """
+    Return the shared keep-alive session, creating it on first use
+
+    The connection pool holds at least `pool_size` connections per host. A
+    larger size than the current one remounts the adapter, so callers about
+    to run more requests in parallel than the pool keeps alive do not have
+    urllib3 discard their connections ("Connection pool is full").
+    """
+    global _session, _pool_size
+    if _session is None or _pool_size < pool_size:
+        with _session_lock:
+            if _session is None:
+                session = RateLimitedSession()
+                session.headers.update(HEADERS)
+                _session = session
+            if _pool_size < pool_size:
+                # Requests in flight finish on the old adapter's connections
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                _session.mount("https://", adapter)
+                _session.mount("http://", adapter)
+                _pool_size = pool_size
+    return _session
+
+
+def get_cache() -> Optional[HTTPCache]:
+    """Return the shared response cache, or None when caching is disabled"""
+    global _cache, _cache_loaded
+    if not _cache_loaded:
+        with _session_lock:
+            if not _cache_loaded:
+                config = CacheConfig.from_env()
+                _cache = HTTPCache(config) if config.enabled else None
+                _cache_loaded = True
+    return _cache
+
+
+def configure_cache(config: Optional[CacheConfig]) -> Optional[HTTPCache]:
+    """Replace the shared response cache; pass None to disable caching"""
+    global _cache, _cache_loaded
+    with _session_lock:
+        _cache = HTTPCache(config) if config is not None and config.enabled else None
+        _cache_loaded = True
+    return _cache
+
+
+def get_json(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    timeout=DEFAULT_TIMEOUT,
+    use_cache: bool = True
+) -> Any:
+    """GET a JSON document through the shared session and response cache"""
+    cache = get_cache() if use_cache else None
+    if cache is not None:
+        return cache.get_json(get_session(), url, params=params, timeout=timeout)
+
+    response = get_session().get(url, params=params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def fetch_trades(
+    address: str,
+    limit: int = 100,
+    offset: int = 0,
+    taker_only: bool = True,
+    use_cache: bool = True
+) -> List[Dict[str, Any]]:
+    """Fetch one page of a wallet's trades from the data-api, newest first"""
+    params = {
+        "user": address,
+        "limit": limit,
+        "offset": offset,
+        "takerOnly": "true" if taker_only else "false",
+    }
+    return get_json(f"{DATA_API}/trades", params=params, use_cache=use_cache) or []
+
+
+def fetch_price_history(
+    token_id: str,
+    start_ts: Optional[int] = None,
+    end_ts: Optional[int] = None,
+    fidelity: int = 60,
+    interval: Optional[str] = None,
+    use_cache: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Fetch a token's price series from the CLOB as [{"t": unix seconds, "p": price}]
+
+    `fidelity` is the bucket size in minutes; give either a start/end range or
+    an `interval` such as "1d", "1w" or "max".
+    """
+    params: Dict[str, Any] = {"market": token_id, "fidelity": fidelity}
+    if interval:
+        params["interval"] = interval
+    if start_ts is not None:
+        params["startTs"] = int(start_ts)
+    if end_ts is not None:
+        params["endTs"] = int(end_ts)
+    return (get_json(f"{CLOB_API}/prices-history", params=params, use_cache=use_cache) or {}).get("history") or []
+
+
+def _fetch_positions_page(address: str, offset: int, limit: int) -> List[Dict[str, Any]]:
+    params = {"user": address, "limit": limit, "offset": offset}
+    return get_json(f"{DATA_API}/positions", params=params) or []
+
+
+def fetch_positions(
+    address: str,
+    page_size: int = POSITIONS_PAGE_SIZE,
+    max_workers: int = POSITIONS_PAGE_WORKERS
+) -> pd.DataFrame:
+    """
+    Fetch every position held by a wallet as a single DataFrame
+
+    The first page is fetched on its own. The data-api does not report a total,
+    so when the first page comes back full the following pages are requested in
+    parallel windows of `max_workers` offsets until a short page marks the end.
+
+    Args:
+        address: Polymarket wallet address
+        page_size: Rows per request (the API caps this at 500)
+        max_workers: Number of pages fetched concurrently
+
+    Returns:
+        DataFrame with one row per position
+    """
+    rows = _fetch_positions_page(address, 0, page_size)
+    if len(rows) < page_size:
+        return pd.DataFrame(rows)
+
+    offset = page_size
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while True:
+            offsets = [offset + i * page_size for i in range(max_workers)]
+            pages = list(pool.map(lambda o: _fetch_positions_page(address, o, page_size), offsets))
+
+            done = False
+            for page in pages:
+                rows.extend(page)
+                if len(page) < page_size:
+                    done = True
+                    break
+            if done:
+                break
+            offset = offsets[-1] + page_size
+
+    logger.info(f"Fetched {len(rows)} positions for {address} in pages of {page_size}")
+    return pd.DataFrame(rows)
@@ -0,0 +1,299 @@
+"""
+Position Diff Engine
+Compares a wallet's current positions with a stored snapshot and emails a
+compact delta only when a change crosses the configured thresholds
+"""
+import html
+import os
+from concurrent.futures import Future
+from contextlib import nullcontext
+from dataclasses import dataclass
+from typing import List, Optional, Union
+import logging
+
+import numpy as np
+import pandas as pd
+
+from polymarket_client import fetch_positions
+from report_fingerprint import ReportState
+from snapshot_store import SnapshotStore
+
+
+logger = logging.getLogger(__name__)
+
+CHANGE_KINDS = ["opened", "closed", "resized", "repriced"]
+
+DIFF_COLUMNS = [
+    "change", "title", "outcome",
+    "size_prev", "size_cur", "size_delta", "size_change_pct",
+    "price_prev", "price_cur", "price_delta",
+    "value_prev", "value_cur", "value_delta",
+]
+
+
+@dataclass
+class DiffThresholds:
+    """What counts as a change worth an email"""
+    min_position_value: float = 1.0     # $; smaller positions are dust and ignored
+    min_value_change: float = 50.0      # $; resized/repriced positions qualify past this
+    min_size_change_pct: float = 0.10   # resized positions qualify past this fraction
+    min_price_change: float = 0.05      # $ per share (5¢); repriced positions qualify past this
+    notify_opened: bool = True
+    notify_closed: bool = True
+
+    @classmethod
+    def from_env(cls) -> 'DiffThresholds':
+        """Load thresholds from environment variables"""
+        return cls(
+            min_position_value=float(os.getenv('DIFF_MIN_POSITION_VALUE', str(cls.min_position_value))),
+            min_value_change=float(os.getenv('DIFF_MIN_VALUE_CHANGE', str(cls.min_value_change))),
+            min_size_change_pct=float(os.getenv('DIFF_MIN_SIZE_CHANGE_PCT', str(cls.min_size_change_pct))),
+            min_price_change=float(os.getenv('DIFF_MIN_PRICE_CHANGE', str(cls.min_price_change))),
+            notify_opened=os.getenv('DIFF_NOTIFY_OPENED', 'True').lower() == 'true',
+            notify_closed=os.getenv('DIFF_NOTIFY_CLOSED', 'True').lower() == 'true'
+        )
+
+
+def _diff_key(previous: pd.DataFrame, current: pd.DataFrame) -> List[str]:
+    # Token id when both sides have it; otherwise market plus outcome
+    if "asset" in previous.columns and "asset" in current.columns:
+        return ["asset"]
+    return ["conditionId", "outcome"]
+
+
+def _held(df: pd.DataFrame, key: List[str]) -> pd.DataFrame:
+    """Key, display and numeric columns of the positions actually held"""
+    out = pd.DataFrame(index=df.index)
+    for col in key:
+        out[col] = df[col].astype(str) if col in df.columns else ""
+    for col in ("title", "outcome"):
+        if col not in key:
+            out[col] = df[col] if col in df.columns else None
+    for src, dst in (("size", "size"), ("curPrice", "price"), ("currentValue", "value")):
+        out[dst] = pd.to_numeric(df[src], errors="coerce") if src in df.columns else np.nan
+    out = out[out["size"] > 0]
+    return out.drop_duplicates(key, keep="last")
+
+
+def diff_positions(previous: pd.DataFrame, current: pd.DataFrame) -> pd.DataFrame:
+    """
+    Classify every position as opened, closed, resized, repriced or unchanged
+
+    One outer merge on the position key; all comparisons are column-wise.
+    Rows are ordered by the size of the value change.
+    """
+    key = _diff_key(previous, current)
+    merged = _held(previous, key).merge(
+        _held(current, key), on=key, how="outer", suffixes=("_prev", "_cur"), indicator=True
+    )
+
+    size_prev = merged["size_prev"].fillna(0.0)
+    size_cur = merged["size_cur"].fillna(0.0)
+    value_prev = merged["value_prev"].fillna(0.0)
+    value_cur = merged["value_cur"].fillna(0.0)
+
+    out = merged[key].copy()
+    out["title"] = merged["title_cur"].combine_first(merged["title_prev"])
+    if "outcome" not in key:
+        out["outcome"] = merged["outcome_cur"].combine_first(merged["outcome_prev"])
+    out["size_prev"] = size_prev
+    out["size_cur"] = size_cur
+    out["size_delta"] = size_cur - size_prev
+    out["size_change_pct"] = out["size_delta"] / size_prev.where(size_prev > 0)
+    out["price_prev"] = merged["price_prev"]
+    out["price_cur"] = merged["price_cur"]
+    out["price_delta"] = merged["price_cur"] - merged["price_prev"]
+    out["value_prev"] = value_prev
+    out["value_cur"] = value_cur
+    out["value_delta"] = value_cur - value_prev
+
+    indicator = merged["_merge"].astype(str)
+    resized = ~np.isclose(size_cur, size_prev, rtol=1e-6, atol=1e-6)
+    repriced = (out["price_delta"].abs() > 1e-9).fillna(False)
+    out["change"] = np.select(
+        [indicator.eq("right_only"), indicator.eq("left_only"), resized, repriced],
+        CHANGE_KINDS,
+        default="unchanged"
+    )
+
+    order = out["value_delta"].abs().sort_values(ascending=False, kind="stable").index
+    return out.loc[order, key + [c for c in DIFF_COLUMNS if c not in key]].reset_index(drop=True)
+
+
+def significant_changes(diff: pd.DataFrame, thresholds: Optional[DiffThresholds] = None) -> pd.DataFrame:
+    """Rows of a diff that cross the thresholds"""
+    t = thresholds or DiffThresholds()
+    change = diff["change"]
+    big_enough = np.maximum(diff["value_prev"], diff["value_cur"]) >= t.min_position_value
+    value_moved = diff["value_delta"].abs() >= t.min_value_change
+
+    keep = (
+        (change.eq("opened") & t.notify_opened)
+        | (change.eq("closed") & t.notify_closed)
+        | (change.eq("resized") & ((diff["size_change_pct"].abs() >= t.min_size_change_pct).fillna(False) | value_moved))
+        | (change.eq("repriced") & ((diff["price_delta"].abs() >= t.min_price_change).fillna(False) | value_moved))
+    )
+    return diff[keep & big_enough].reset_index(drop=True)
+
+
+def summarize_changes(changes: pd.DataFrame) -> str:
+    """e.g. '2 opened, 1 closed'"""
+    counts = changes["change"].value_counts()
+    return ", ".join(f"{counts[kind]} {kind}" for kind in CHANGE_KINDS if kind in counts)
+
+
+def _money(values: pd.Series, signed: bool = False) -> pd.Series:
+    fmt = "${:+,.2f}" if signed else "${:,.2f}"
+    return values.map(lambda x: "" if pd.isna(x) else fmt.format(float(x)))
+
+
+def _cents(values: pd.Series) -> pd.Series:
+    return values.map(lambda x: "" if pd.isna(x) else f"{float(x) * 100:.0f}¢")
+
+
+def render_delta_table(changes: pd.DataFrame) -> str:
+    """Compact, inline-styled <table> of the changes, small enough for any mail client"""
+    colors = {"opened": "#10b981", "closed": "#ef4444", "resized": "#7c3aed", "repriced": "#4a5568"}
+    change = changes["change"]
+    delta_color = np.where(changes["value_delta"] >= 0, "#10b981", "#ef4444")
+    cell = '<td style="padding:6px 10px;border-bottom:1px solid #e2e8f0;'
+
+    rows = (
+        "<tr>"
+        + cell + "font-weight:600;color:" + change.map(colors).fillna("#4a5568") + '">' + change.str.upper() + "</td>"
+        + cell + '">' + changes["title"].fillna("").astype(str).map(html.escape)
+        + ' <span style="color:#718096">' + changes["outcome"].fillna("").astype(str).map(html.escape) + "</span></td>"
+        + cell + 'text-align:right">' + changes["size_prev"].map("{:,.1f}".format) + " → " + changes["size_cur"].map("{:,.1f}".format) + "</td>"
+        + cell + 'text-align:right">' + _cents(changes["price_prev"]) + " → " + _cents(changes["price_cur"]) + "</td>"
+        + cell + 'text-align:right">' + _money(changes["value_cur"]) + "</td>"
+        + cell + "text-align:right;color:" + pd.Series(delta_color, index=changes.index) + '">' + _money(changes["value_delta"], signed=True) + "</td>"
+        + "</tr>"
+    )
+    header = "".join(
+        f'<th style="padding:6px 10px;text-align:{align};color:#4a5568;font-size:12px">{name}</th>'
+        for name, align in (("Change", "left"), ("Market", "left"), ("Shares", "right"),
+                            ("Price", "right"), ("Value", "right"), ("Δ Value", "right"))
+    )
+    return (
+        f'<table style="width:100%;border-collapse:collapse;font-size:14px"><tr>{header}</tr>'
+        + "\n".join(rows)
+        + "</table>"
+    )
+
+
+def render_delta_html(address: str, changes: pd.DataFrame) -> str:
+    """Standalone delta email: header with the summary and address, then the table"""
+    return (
+        '<html><body style="margin:0;background:#f4f7fa;font-family:\'Segoe UI\',Tahoma,Arial,sans-serif">'
+        '<div style="max-width:900px;margin:20px auto;background:#ffffff;border-radius:8px;overflow:hidden">'
+        '<div style="background:linear-gradient(135deg,#667eea 0%,#764ba2 100%);padding:16px 20px;color:#ffffff">'
+        f'<div style="font-size:20px;font-weight:600">Position changes: {html.escape(summarize_changes(changes))}</div>'
+        f'<div style="font-size:12px;opacity:0.85">{html.escape(address)}</div></div>'
+        + render_delta_table(changes)
+        + "</div></body></html>"
+    )
+
+
+def check_wallet(
+    address: str,
+    recipient_email: Union[str, List[str], None] = None,
+    thresholds: Optional[DiffThresholds] = None,
+    store: Optional[SnapshotStore] = None,
+    state: Optional[ReportState] = None,
+    digest=None,
+    sender=None
+) -> pd.DataFrame:
+    """
+    Fetch and store a wallet's positions, diff them against the baseline
+    snapshot and email the significant changes
+
+    The baseline is the snapshot the last delta was measured against (the
+    previous snapshot on the first run), and it only moves forward when a
+    delta is reported, so slow drift still adds up to a notification.
+    With a `DigestMailer` the changes are buffered into the recipients'
+    next digest instead of being emailed right away. `sender` is a
+    GmailSender or MailQueue owned by the caller; a temporary GmailSender is
+    used if None. With a MailQueue the baseline moves once the email is
+    delivered rather than when it is queued.
+
+    Returns:
+        The significant changes (empty when nothing crossed a threshold)
+    """
+    store = store or SnapshotStore()
+    state = state or ReportState()
+
+    baseline_id = state.last(address, kind="delta")
+    df = fetch_positions(address)
+    current_id = store.append(address, df)
+
+    baseline = store.snapshot(int(baseline_id)) if baseline_id else None
+    if baseline is None:
+        # First run, or the baseline was compacted away
+        previous = store.latest(address, before_id=current_id)
+        baseline = previous[1] if previous is not None else None
+    if baseline is None:
+        state.record(address, str(current_id), kind="delta")
+        print(f"Stored first snapshot for {address}; changes are reported from the next run")
+        return significant_changes(diff_positions(df, df), thresholds)
+
+    changes = significant_changes(diff_positions(baseline, df), thresholds)
+    if changes.empty:
+        print(f"No significant position changes for {address}")
+        return changes
+
+    summary = summarize_changes(changes)
+    print(f"Position changes for {address}: {summary}")
+    if recipient_email and digest is not None:
+        from mail_digest import delta_notification
+
+        recipients = list(recipient_email) if isinstance(recipient_email, (list, tuple)) else [recipient_email]
+        digest.notify(recipients, delta_notification(address, changes))
+    elif recipient_email:
+        from gmail_sender import GmailSender
+        from mail_queue import delivery_outcome
+
+        with nullcontext(sender) if sender is not None else GmailSender() as mailer:
+            subject = f"Polymarket position changes - {address[:8]}...: {summary}"
+            body_html = render_delta_html(address, changes)
+            if isinstance(recipient_email, (list, tuple)) and len(recipient_email) > 1:
+                result = mailer.send_bulk(list(recipient_email), subject, body_html=body_html)
+            else:
+                result = mailer.send_email(to_emails=recipient_email, subject=subject, body_html=body_html)
+        success = delivery_outcome(result)
+        if isinstance(success, Future):
+            # Queued: keep the old baseline until the email is out
+            def _record_delivery(future: Future):
+                if future.result():
+                    state.record(address, str(current_id), kind="delta")
+                else:
+                    print(f"Delta email for {address} was not delivered")
+            success.add_done_callback(_record_delivery)
+            return changes
+        if not success:
+            # Keep the old baseline so the same changes are reported next time
+            print("Failed to send delta email")
+            return changes
+
+    state.record(address, str(current_id), kind="delta")
+    return changes
+
+
+if __name__ == "__main__":
+    import sys
+    from batch_fetch import load_addresses
+
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    recipient = None
+    if "--send-email" in args:
+        i = args.index("--send-email")
+        recipient = args[i + 1] if i + 1 < len(args) else None
+        args = args[:i] + args[i + 2:]
+        if recipient and "," in recipient:
+            recipient = [r.strip() for r in recipient.split(",") if r.strip()]
+
+    thresholds = DiffThresholds.from_env()
+    for address in args or load_addresses():
+        changes = check_wallet(address, recipient, thresholds)
+        if not changes.empty:
+            print(changes.to_string(index=False))
@@ -0,0 +1,283 @@
+"""
+Price History
+Per-token CLOB price series cached in SQLite with incremental tail updates,
+plus Largest-Triangle-Three-Buckets downsampling and SVG sparklines for charts
+"""
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from polymarket_client import fetch_price_history
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = ".polymarket_cache/prices.sqlite"
+
+DAY = 86400
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prices (
+    token_id TEXT NOT NULL,
+    fidelity INTEGER NOT NULL,
+    t INTEGER NOT NULL,
+    p REAL NOT NULL,
+    PRIMARY KEY (token_id, fidelity, t)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS price_cursors (
+    token_id TEXT NOT NULL,
+    fidelity INTEGER NOT NULL,
+    first_t INTEGER,
+    last_t INTEGER,
+    covered_from INTEGER NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (token_id, fidelity)
+);
+"""
+
+
+class PriceHistoryStore:
+    """
+    Local price series per (token, fidelity)
+
+    The first sync fetches the requested lookback. Later syncs only fetch the
+    tail from the last stored bucket on (which is re-fetched, since it may
+    have been partial), plus any older range not covered yet, and skip the
+    request entirely while the series is younger than one bucket.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, chunk_days: float = 15.0):
+        self.db_path = Path(db_path or os.getenv('POLYMARKET_PRICES_DB', DEFAULT_DB_PATH))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        # The CLOB rejects start/end ranges that are too long for the fidelity
+        self.chunk_seconds = int(chunk_days * DAY)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _cursor(self, token_id: str, fidelity: int) -> Optional[Tuple[Optional[int], Optional[int], int, float]]:
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT first_t, last_t, covered_from, updated_at FROM price_cursors WHERE token_id = ? AND fidelity = ?",
+                (str(token_id), int(fidelity))
+            ).fetchone()
+
+    def _fetch_range(self, token_id: str, start: int, end: int, fidelity: int) -> List[Dict]:
+        points: List[Dict] = []
+        for chunk_start in range(start, end, self.chunk_seconds):
+            chunk_end = min(chunk_start + self.chunk_seconds, end)
+            points.extend(fetch_price_history(token_id, start_ts=chunk_start, end_ts=chunk_end, fidelity=fidelity))
+        return points
+
+    def sync(
+        self,
+        token_id: str,
+        fidelity: int = 60,
+        lookback_days: float = 30.0,
+        now: Optional[float] = None
+    ) -> int:
+        """
+        Bring a token's series up to date and cover at least `lookback_days`
+
+        Returns:
+            Number of points fetched
+        """
+        token_id = str(token_id)
+        now = int(time.time() if now is None else now)
+        start = now - int(lookback_days * DAY)
+        bucket = int(fidelity) * 60
+        cursor = self._cursor(token_id, fidelity)
+
+        ranges = []
+        if cursor is None:
+            ranges.append((start, now))
+            covered_from = start
+        else:
+            first_t, last_t, covered_from, updated_at = cursor
+            if start < covered_from:
+                ranges.append((start, covered_from))
+                covered_from = start
+            if now - updated_at >= bucket:
+                tail_from = last_t if last_t is not None else covered_from
+                ranges.append((max(tail_from, covered_from), now))
+        if not ranges:
+            return 0
+
+        points = [pt for a, b in ranges for pt in self._fetch_range(token_id, a, b, fidelity)]
+        rows = [(token_id, int(fidelity), int(pt["t"]), float(pt["p"])) for pt in points if "t" in pt and "p" in pt]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO prices (token_id, fidelity, t, p) VALUES (?, ?, ?, ?)", rows)
+            first_t, last_t = conn.execute(
+                "SELECT MIN(t), MAX(t) FROM prices WHERE token_id = ? AND fidelity = ?", (token_id, int(fidelity))
+            ).fetchone()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO price_cursors (token_id, fidelity, first_t, last_t, covered_from, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (token_id, int(fidelity), first_t, last_t, covered_from, now)
+            )
+        logger.debug(f"Price history {token_id[:12]}...: {len(rows)} points over {len(ranges)} range(s)")
+        return len(rows)
+
+    def sync_many(self, token_ids: Iterable[str], workers: int = 4, **kwargs) -> Dict[str, int]:
+        """Sync several tokens concurrently; failures are logged and count as 0"""
+        def run(token_id: str) -> int:
+            try:
+                return self.sync(token_id, **kwargs)
+            except Exception as e:
+                logger.warning(f"Price history sync failed for {token_id}: {str(e)}")
+                return 0
+
+        token_ids = list(dict.fromkeys(str(t) for t in token_ids if t))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return dict(zip(token_ids, pool.map(run, token_ids)))
+
+    def load(
+        self,
+        token_id: str,
+        fidelity: int = 60,
+        start: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Stored points as a frame with `t` (unix seconds) and `p`, oldest first"""
+        query = "SELECT t, p FROM prices WHERE token_id = ? AND fidelity = ?"
+        params: list = [str(token_id), int(fidelity)]
+        if start is not None:
+            query += " AND t >= ?"
+            params.append(int(start))
+        if end is not None:
+            query += " AND t <= ?"
+            params.append(int(end))
+        with self._connect() as conn:
+            return pd.read_sql_query(query + " ORDER BY t", conn, params=params)
+
+    def history(self, token_id: str, fidelity: int = 60, lookback_days: float = 30.0) -> pd.DataFrame:
+        """Sync, then load the last `lookback_days` of a token's series"""
+        self.sync(token_id, fidelity=fidelity, lookback_days=lookback_days)
+        return self.load(token_id, fidelity, start=int(time.time() - lookback_days * DAY))
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indexes of the points Largest-Triangle-Three-Buckets keeps
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the average of the next bucket. Bucket bounds and averages are computed
+    up front, leaving one short loop over buckets for the sequential part.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket b (0..n_out-3) covers [edges[b], edges[b+1]); the last point is its own bucket
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    sums_x = np.add.reduceat(x, edges)[:-1]
+    sums_y = np.add.reduceat(y, edges)[:-1]
+    counts = np.diff(edges)
+    avg_x = np.r_[sums_x / counts, x[-1]]
+    avg_y = np.r_[sums_y / counts, y[-1]]
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        nx, ny = avg_x[b + 1], avg_y[b + 1]
+        area = np.abs((x[a] - nx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (ny - y[a]))
+        a = lo + int(np.argmax(area))
+        keep[b + 1] = a
+    return keep
+
+
+def downsample(history: pd.DataFrame, points: int = 60) -> pd.DataFrame:
+    """A `t`/`p` frame reduced to at most `points` rows with LTTB"""
+    if len(history) <= points:
+        return history.reset_index(drop=True)
+    keep = lttb(history["t"].to_numpy(dtype=float), history["p"].to_numpy(dtype=float), points)
+    return history.iloc[keep].reset_index(drop=True)
+
+
+def sparkline_svg(
+    t: np.ndarray,
+    p: np.ndarray,
+    width: int = 120,
+    height: int = 28,
+    stroke_width: float = 1.5
+) -> str:
+    """Inline SVG polyline of a price series, green when it ended up, red when down"""
+    t = np.asarray(t, dtype=float)
+    p = np.asarray(p, dtype=float)
+    if len(t) < 2:
+        return ""
+    pad = stroke_width
+    span_t = (t[-1] - t[0]) or 1.0
+    lo, hi = np.nanmin(p), np.nanmax(p)
+    span_p = (hi - lo) or 1.0
+    xs = pad + (t - t[0]) / span_t * (width - 2 * pad)
+    ys = pad + (hi - p) / span_p * (height - 2 * pad)
+    points = " ".join(f"{px:.1f},{py:.1f}" for px, py in zip(xs, ys))
+    color = "#10b981" if p[-1] >= p[0] else "#ef4444"
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}"><polyline fill="none" stroke="{color}" '
+        f'stroke-width="{stroke_width}" stroke-linejoin="round" points="{points}"/></svg>'
+    )
+
+
+def position_sparklines(
+    positions: pd.DataFrame,
+    store: Optional[PriceHistoryStore] = None,
+    points: int = 48,
+    fidelity: int = 60,
+    lookback_days: float = 30.0,
+    **svg_kwargs
+) -> pd.Series:
+    """SVG sparkline per position, indexed by asset (token id)"""
+    if positions.empty or "asset" not in positions.columns:
+        return pd.Series(dtype=object)
+    store = store or PriceHistoryStore()
+    assets = positions["asset"].astype(str).drop_duplicates()
+    store.sync_many(assets, fidelity=fidelity, lookback_days=lookback_days)
+    start = int(time.time() - lookback_days * DAY)
+    lines = {}
+    for asset in assets:
+        series = downsample(store.load(asset, fidelity, start=start), points)
+        lines[asset] = sparkline_svg(series["t"], series["p"], **svg_kwargs)
+    return pd.Series(lines, dtype=object)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    if len(sys.argv) < 2:
+        print("Usage: python price_history.py <token_id> [points]")
+        sys.exit(1)
+
+    store = PriceHistoryStore()
+    history = store.history(sys.argv[1])
+    reduced = downsample(history, int(sys.argv[2]) if len(sys.argv) > 2 else 60)
+    print(f"{len(history)} points stored, {len(reduced)} after LTTB")
+    print(reduced.assign(time=pd.to_datetime(reduced["t"], unit="s")).to_string(index=False))
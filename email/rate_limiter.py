@@ -0,0 +1,134 @@
+"""
+Client-Side Rate Limiting
+Per-host token buckets shared by every Polymarket API client, usable from
+threads and from asyncio
+"""
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# (requests per second, burst capacity) per host
+DEFAULT_HOST_LIMITS: Dict[str, Tuple[float, float]] = {
+    "data-api.polymarket.com": (15.0, 30.0),
+    "clob.polymarket.com": (20.0, 40.0),
+}
+DEFAULT_LIMIT: Tuple[float, float] = (10.0, 20.0)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Callers reserve tokens up front, so the balance may go negative; the
+    deficit is how long the caller has to wait. This queues concurrent
+    callers fairly without holding the lock while sleeping.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take `tokens` and return how many seconds the caller must wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available, without taking them"""
+        with self._lock:
+            now = time.monotonic()
+            available = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            wait = (tokens - available) / self.rate if available < tokens else 0.0
+            return max(wait, self._blocked_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """Block the bucket for `seconds`, e.g. after a 429 with Retry-After"""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: float = 1.0) -> None:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class RateLimiter:
+    """Registry of token buckets keyed by host"""
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[float, float]]] = None, default: Tuple[float, float] = DEFAULT_LIMIT):
+        self.limits = dict(DEFAULT_HOST_LIMITS if limits is None else limits)
+        self.default = default
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).hostname or url
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(host)
+                if bucket is None:
+                    rate, capacity = self.limits.get(host, self.default)
+                    bucket = self._buckets[host] = TokenBucket(rate, capacity)
+        return bucket
+
+    def acquire(self, url: str) -> None:
+        self.bucket(url).acquire()
+
+    async def acquire_async(self, url: str) -> None:
+        await self.bucket(url).acquire_async()
+
+    def pause(self, url: str, seconds: float) -> None:
+        self.bucket(url).pause(seconds)
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Return the process-wide limiter shared by all API clients"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
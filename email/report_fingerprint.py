@@ -0,0 +1,122 @@
+"""
+Report Fingerprints
+Content hashes over normalized position rows, used to skip re-rendering and
+re-sending reports that have not meaningfully changed
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_DIR = ".polymarket_cache/reports"
+
+# Columns that affect the rendered report, with the precision that is
+# meaningful for each numeric one
+TEXT_COLUMNS = ["title", "marketQuestion", "marketSlug", "icon", "outcome", "sparkline"]
+NUMERIC_PRECISION = {
+    "size": 1,
+    "avgPrice": 4,
+    "curPrice": 4,
+    "currentValue": 2,
+    "cashPnl": 2,
+    "percentPnl": 4,
+}
+
+
+def normalize_positions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduce a positions frame to what the report shows: rows with a positive
+    value, sorted the way the report sorts them, with numbers rounded to
+    display precision
+    """
+    out = pd.DataFrame(index=df.index)
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            out[col] = df[col].astype(str)
+    for col, digits in NUMERIC_PRECISION.items():
+        if col in df.columns:
+            out[col] = pd.to_numeric(df[col], errors="coerce").round(digits)
+
+    if "currentValue" in out.columns:
+        out = out[out["currentValue"] > 0]
+        out = out.sort_values(by="currentValue", ascending=False)
+    return out.reset_index(drop=True)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hash of every row, independent of the index"""
+    if df.empty:
+        return np.array([], dtype=np.uint64)
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def positions_fingerprint(df: pd.DataFrame) -> str:
+    """Fingerprint of a positions frame over its normalized rows"""
+    normalized = normalize_positions(df)
+    digest = hashlib.sha256()
+    digest.update(",".join(normalized.columns).encode("utf-8"))
+    digest.update(row_hashes(normalized).tobytes())
+    return digest.hexdigest()
+
+
+class ReportState:
+    """Last fingerprint rendered for each wallet, kept as small JSON files"""
+
+    def __init__(self, state_dir: Optional[str] = None):
+        self.state_dir = Path(state_dir or os.getenv('POLYMARKET_REPORT_STATE_DIR', DEFAULT_STATE_DIR))
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, address: str, kind: str) -> Path:
+        return self.state_dir / f"{address.lower()}.{kind}.json"
+
+    def last(self, address: str, kind: str = "render") -> Optional[str]:
+        try:
+            return json.loads(self._path(address, kind).read_text(encoding="utf-8"))["fingerprint"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def has_changed(self, address: str, fingerprint: str, kind: str = "render") -> bool:
+        return self.last(address, kind) != fingerprint
+
+    def record(self, address: str, fingerprint: str, kind: str = "render") -> None:
+        path = self._path(address, kind)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"fingerprint": fingerprint, "recorded_at": time.time()}), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+class RowCache:
+    """LRU of rendered table rows keyed by the row hash"""
+
+    def __init__(self, max_entries: int = 50_000):
+        self.max_entries = max_entries
+        self._rows: "OrderedDict[int, str]" = OrderedDict()
+
+    def __contains__(self, key) -> bool:
+        return key in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, key) -> Optional[str]:
+        row = self._rows.get(key)
+        if row is not None:
+            self._rows.move_to_end(key)
+        return row
+
+    def update(self, rows: Dict[int, str]) -> None:
+        self._rows.update(rows)
+        for key in rows:
+            self._rows.move_to_end(key)
+        while len(self._rows) > self.max_entries:
+            self._rows.popitem(last=False)
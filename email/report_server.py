@@ -0,0 +1,299 @@
+"""
+Report Web Server
+Serves rendered position reports at /report/<address> with an in-memory page
+cache keyed by positions fingerprint, compression, ETags and request coalescing
+"""
+import gzip
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional
+import logging
+
+import pandas as pd
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+from create_html import get_user_positions, prepare_positions, render_report_html
+from price_history import PriceHistoryStore, position_sparklines
+from report_fingerprint import RowCache, positions_fingerprint
+
+
+logger = logging.getLogger(__name__)
+
+ADDRESS_RE = re.compile(r"0x[0-9a-fA-F]{40}")
+REPORT_PATH_RE = re.compile(r"/report/([^/]+)")
+
+
+@dataclass
+class RenderedPage:
+    """A rendered report and its compressed variants, built on first request"""
+    fingerprint: str
+    body: bytes
+    _encoded: Dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def etag(self) -> str:
+        # Weak: the same positions always give an equivalent page, even if it
+        # was re-rendered (with a new footer timestamp) after an eviction
+        return f'W/"{self.fingerprint[:32]}"'
+
+    def encoded(self, encoding: str) -> bytes:
+        if encoding == "identity":
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            if encoding == "br":
+                data = brotli.compress(self.body, quality=5)
+            else:
+                data = gzip.compress(self.body, compresslevel=6)
+            self._encoded[encoding] = data
+        return data
+
+
+class LRUCache:
+    """Thread-safe mapping that evicts the least recently used entry past `max_entries`"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._items)
+
+
+class PageCache(LRUCache):
+    """LRU of rendered pages keyed by positions fingerprint"""
+
+    def put(self, page: RenderedPage) -> None:
+        self.set(page.fingerprint, page)
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers share its result"""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class ReportService:
+    """
+    Builds report pages for wallets
+
+    Concurrent requests for one wallet share a single fetch and render. A
+    wallet's latest page is served without refetching for `max_age` seconds,
+    and pages are only re-rendered when the positions fingerprint changes.
+    Per-wallet state is kept for at most `cache_entries` wallets, and web
+    fetches are not recorded in the snapshot history. With `sparklines`,
+    every position shows its recent price history from the local cache.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[str], pd.DataFrame] = partial(get_user_positions, record=False),
+        cache_entries: int = 64,
+        max_age: float = 30.0,
+        sparklines: bool = False,
+        price_store: Optional[PriceHistoryStore] = None
+    ):
+        self.fetch = fetch
+        self.max_age = max_age
+        self.sparklines = sparklines
+        self.price_store = price_store or (PriceHistoryStore() if sparklines else None)
+        self.cache = PageCache(cache_entries)
+        self._flight = SingleFlight()
+        self._latest = LRUCache(cache_entries)      # address -> (built at, page)
+        self._row_caches = LRUCache(cache_entries)  # address -> RowCache
+
+    def page(self, address: str) -> RenderedPage:
+        if not ADDRESS_RE.fullmatch(address):
+            raise ValueError(f"Invalid wallet address: {address}")
+        key = address.lower()
+        latest = self._latest.get(key)
+        if latest is not None and time.monotonic() - latest[0] < self.max_age:
+            return latest[1]
+        return self._flight.do(key, lambda: self._build(key))
+
+    def _build(self, address: str) -> RenderedPage:
+        df = prepare_positions(self.fetch(address))
+        if self.sparklines:
+            df = self._with_sparklines(df)
+        fingerprint = positions_fingerprint(df)
+        page = self.cache.get(fingerprint)
+        if page is None:
+            row_cache = self._row_caches.get(address)
+            if row_cache is None:
+                row_cache = RowCache()
+                self._row_caches.set(address, row_cache)
+            page = RenderedPage(fingerprint, render_report_html(df, row_cache=row_cache, prepared=True).encode("utf-8"))
+            self.cache.put(page)
+        self._latest.set(address, (time.monotonic(), page))
+        return page
+
+    def _with_sparklines(self, df: pd.DataFrame) -> pd.DataFrame:
+        if "asset" not in df.columns:
+            return df
+        # Prepared frames hold only the positions the report shows
+        try:
+            lines = position_sparklines(df, self.price_store)
+        except Exception as e:
+            logger.warning(f"Sparklines unavailable: {str(e)}")
+            return df
+        return df.assign(sparkline=df["asset"].astype(str).map(lines).to_numpy())
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """Pick br (when available), gzip or identity from an Accept-Encoding header"""
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        token, _, params = item.strip().partition(";")
+        q = 1.0
+        match = re.search(r"q=([0-9.]+)", params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        if token:
+            accepted[token.strip().lower()] = q
+    candidates: List[str] = (["br"] if brotli is not None else []) + ["gzip"]
+    for encoding in candidates:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return "identity"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against an ETag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    strip = lambda tag: tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()
+    return strip(etag) in {strip(tag) for tag in if_none_match.split(",")}
+
+
+def make_handler(service: ReportService):
+    class ReportHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            logger.info(f"{self.address_string()} {format % args}")
+
+        def do_GET(self):
+            self._serve(head=False)
+
+        def do_HEAD(self):
+            self._serve(head=True)
+
+        def _send(self, status: int, body: bytes, content_type: Optional[str],
+                  headers: Optional[Dict[str, str]] = None, head: bool = False):
+            self.send_response(status)
+            if content_type:
+                self.send_header("Content-Type", content_type)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            if status != 304:
+                # A 304 must not carry a length that differs from the 200's
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if not head and status != 304:
+                self.wfile.write(body)
+
+        def _serve(self, head: bool):
+            path = self.path.split("?", 1)[0].rstrip("/")
+            if path == "/healthz":
+                return self._send(200, b"ok", "text/plain", head=head)
+            match = REPORT_PATH_RE.fullmatch(path)
+            if not match:
+                return self._send(404, b"Not found", "text/plain", head=head)
+            address = match.group(1)
+            if not ADDRESS_RE.fullmatch(address):
+                return self._send(400, b"Invalid wallet address", "text/plain", head=head)
+
+            try:
+                page = service.page(address)
+            except Exception as e:
+                logger.error(f"Failed to build report for {address}: {str(e)}")
+                return self._send(502, b"Could not load positions", "text/plain", head=head)
+
+            headers = {
+                "ETag": page.etag,
+                "Vary": "Accept-Encoding",
+                "Cache-Control": f"max-age={int(service.max_age)}",
+            }
+            if etag_matches(self.headers.get("If-None-Match"), page.etag):
+                return self._send(304, b"", None, headers, head=True)
+
+            encoding = negotiate_encoding(self.headers.get("Accept-Encoding"))
+            if encoding != "identity":
+                headers["Content-Encoding"] = encoding
+            self._send(200, page.encoded(encoding), "text/html; charset=utf-8", headers, head=head)
+
+    return ReportHandler
+
+
+def serve(host: str = "0.0.0.0", port: int = 8000, service: Optional[ReportService] = None) -> ThreadingHTTPServer:
+    """Create the server; call `serve_forever()` on the result"""
+    server = ThreadingHTTPServer((host, port), make_handler(service or ReportService()))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    service = ReportService(
+        cache_entries=int(os.getenv('REPORT_CACHE_ENTRIES', '64')),
+        max_age=float(os.getenv('REPORT_MAX_AGE', '30')),
+        sparklines=os.getenv('REPORT_SPARKLINES', 'False').lower() == 'true'
+    )
+    server = serve(port=int(os.getenv('PORT', '8000')), service=service)
+    print(f"Serving reports on http://{server.server_address[0]}:{server.server_address[1]}/report/<address>")
+    server.serve_forever()
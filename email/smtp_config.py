@@ -29,10 +29,10 @@ class SMTPConfig:
             use_tls=os.getenv('USE_TLS', 'True').lower() == 'true'
         )
 
-    def validate(self) -> bool:
+    def validate(self, require_password: bool = True) -> bool:
         """Validate that required configuration is present"""
         if not self.sender_email:
             raise ValueError("GMAIL_EMAIL environment variable is required")
-        if not self.sender_password:
+        if require_password and not self.sender_password:
             raise ValueError("GMAIL_APP_PASSWORD environment variable is required")
         return True
\ No newline at end of file
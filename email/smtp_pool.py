@@ -0,0 +1,214 @@
+"""
+SMTP Connection Pool
+Keeps authenticated SMTP sessions alive across messages
+"""
+import re
+import smtplib
+import ssl
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from smtp_config import SMTPConfig
+
+
+logger = logging.getLogger(__name__)
+
+_LEADING_DOT = re.compile(rb'(?m)^\.')
+
+
+def quote_periods(data: bytes) -> bytes:
+    """
+    SMTP dot-stuffing for a CRLF-terminated block of message data
+
+    Parts stuffed separately must each start at a line boundary.
+    """
+    return _LEADING_DOT.sub(b'..', data)
+
+
+@dataclass
+class _PooledConnection:
+    server: smtplib.SMTP
+    messages_sent: int = 0
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class SMTPConnectionPool:
+    """
+    Pool of logged-in SMTP connections
+
+    Idle connections are checked with NOOP before reuse and replaced when
+    the server has dropped them. A connection is retired after
+    `max_messages_per_connection` messages or `max_idle` seconds idle.
+    """
+
+    def __init__(
+        self,
+        config: SMTPConfig,
+        max_connections: int = 2,
+        max_messages_per_connection: int = 50,
+        max_idle: float = 60.0,
+        timeout: float = 30.0
+    ):
+        self.config = config
+        self.max_connections = max_connections
+        self.max_messages_per_connection = max_messages_per_connection
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle: List[_PooledConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def _connect(self) -> _PooledConnection:
+        server = smtplib.SMTP(self.config.smtp_server, self.config.smtp_port, timeout=self.timeout)
+        try:
+            server.set_debuglevel(0)  # Set to 1 for debugging
+            if self.config.use_tls:
+                server.starttls(context=ssl.create_default_context())
+            server.login(self.config.sender_email, self.config.sender_password)
+        except Exception:
+            self._close(server)
+            raise
+        logger.info(f"Opened SMTP connection to {self.config.smtp_server}:{self.config.smtp_port}")
+        return _PooledConnection(server)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _is_alive(conn: _PooledConnection) -> bool:
+        try:
+            return conn.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self) -> _PooledConnection:
+        while True:
+            with self._lock:
+                conn = self._idle.pop() if self._idle else None
+            if conn is None:
+                return self._connect()
+            if time.monotonic() - conn.last_used <= self.max_idle and self._is_alive(conn):
+                return conn
+            self._close(conn.server)
+
+    def _checkin(self, conn: _PooledConnection) -> None:
+        conn.last_used = time.monotonic()
+        if conn.messages_sent >= self.max_messages_per_connection:
+            self._close(conn.server)
+            return
+        with self._lock:
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a live, authenticated connection"""
+        with self._slots:
+            conn = self._checkout()
+            try:
+                yield conn
+            except Exception:
+                # The session may be in an unknown state; never reuse it
+                self._close(conn.server)
+                raise
+            else:
+                self._checkin(conn)
+
+    def send(self, from_addr: str, recipients: List[str], message) -> None:
+        """
+        Send a serialized message (str or bytes) on a pooled connection,
+        retrying once on a fresh connection if the pooled one was dropped
+        """
+        for attempt in range(2):
+            try:
+                with self.connection() as conn:
+                    conn.server.sendmail(from_addr, recipients, message)
+                    conn.messages_sent += 1
+                return
+            except smtplib.SMTPServerDisconnected:
+                if attempt == 1:
+                    raise
+                logger.warning("SMTP connection dropped, retrying on a new connection")
+
+    @staticmethod
+    def _send_data_parts(
+        server: smtplib.SMTP,
+        from_addr: str,
+        recipients: List[str],
+        parts: Iterable[bytes]
+    ) -> Dict[str, Tuple[int, bytes]]:
+        # Same envelope handling as SMTP.sendmail, but DATA is written part by part
+        server.ehlo_or_helo_if_needed()
+        code, resp = server.mail(from_addr)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, resp, from_addr)
+        refused = {}
+        for recipient in recipients:
+            code, resp = server.rcpt(recipient)
+            if code not in (250, 251):
+                refused[recipient] = (code, resp)
+        if len(refused) == len(recipients):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+        code, resp = server.docmd("data")
+        if code != 354:
+            server.rset()
+            raise smtplib.SMTPDataError(code, resp)
+        tail = b""
+        for part in parts:
+            if part:
+                server.send(part)
+                tail = (tail + part)[-2:]
+        if tail != b"\r\n":
+            server.send(b"\r\n")
+        server.send(b".\r\n")
+        code, resp = server.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, resp)
+        return refused
+
+    def send_parts(
+        self,
+        from_addr: str,
+        recipients: List[str],
+        make_parts: Callable[[], Iterable[bytes]]
+    ) -> Dict[str, Tuple[int, bytes]]:
+        """
+        Send a message given as already dot-stuffed, CRLF-terminated byte parts
+
+        The parts are written to the socket one after another, so large shared
+        bodies are never joined or copied per message. `make_parts` is called
+        again if the send has to be retried on a fresh connection.
+
+        Returns:
+            Recipients the server refused, as SMTP.sendmail does
+        """
+        for attempt in range(2):
+            try:
+                with self.connection() as conn:
+                    refused = self._send_data_parts(conn.server, from_addr, recipients, make_parts())
+                    conn.messages_sent += 1
+                return refused
+            except smtplib.SMTPServerDisconnected:
+                if attempt == 1:
+                    raise
+                logger.warning("SMTP connection dropped, retrying on a new connection")
+
+    def close(self) -> None:
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._close(conn.server)
@@ -0,0 +1,334 @@
+"""
+Position Snapshot Store
+Append-only history of every positions fetch per wallet in SQLite, so value
+and PnL can be charted over time
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from report_fingerprint import row_hashes
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = ".polymarket_cache/snapshots.sqlite"
+
+# Numeric columns kept for every position in every snapshot
+VALUE_COLUMNS = [
+    "size", "avgPrice", "curPrice", "initialValue", "currentValue",
+    "cashPnl", "percentPnl", "totalBought", "realizedPnl",
+]
+
+# Descriptive columns, stored once per asset rather than per snapshot
+ASSET_COLUMNS = {
+    "conditionId": "TEXT",
+    "outcome": "TEXT",
+    "outcomeIndex": "INTEGER",
+    "title": "TEXT",
+    "slug": "TEXT",
+    "icon": "TEXT",
+    "endDate": "TEXT",
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshots (
+    snapshot_id INTEGER PRIMARY KEY,
+    wallet TEXT NOT NULL,
+    taken_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL,
+    position_count INTEGER NOT NULL,
+    total_value REAL,
+    total_pnl REAL,
+    fingerprint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_wallet_ts ON snapshots (wallet, taken_at);
+CREATE TABLE IF NOT EXISTS snapshot_positions (
+    snapshot_id INTEGER NOT NULL,
+    asset TEXT NOT NULL,
+    {", ".join(f'"{name}" REAL' for name in VALUE_COLUMNS)},
+    PRIMARY KEY (snapshot_id, asset)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS assets (
+    asset TEXT PRIMARY KEY,
+    {", ".join(f'"{name}" {kind}' for name, kind in ASSET_COLUMNS.items())},
+    updated_at REAL
+);
+"""
+
+
+def _positions_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Asset id plus numeric value columns, one row per asset, sorted by asset"""
+    if df.empty or "asset" not in df.columns:
+        return pd.DataFrame(columns=["asset"] + VALUE_COLUMNS)
+    out = pd.DataFrame({"asset": df["asset"].astype(str)})
+    for col in VALUE_COLUMNS:
+        out[col] = pd.to_numeric(df[col], errors="coerce") if col in df.columns else np.nan
+    out = out[out["asset"].ne("") & df["asset"].notna()]
+    return out.drop_duplicates("asset", keep="last").sort_values("asset").reset_index(drop=True)
+
+
+def _fingerprint(positions: pd.DataFrame) -> str:
+    digest = hashlib.sha256()
+    digest.update(row_hashes(positions).tobytes())
+    return digest.hexdigest()
+
+
+def _sql_value(value: Any) -> Any:
+    # NaN and pandas NA become NULL; numpy scalars become Python ones
+    if value is None or (isinstance(value, float) and np.isnan(value)) or value is pd.NA:
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class SnapshotStore:
+    """Timestamped positions snapshots per wallet"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = Path(db_path or os.getenv('POLYMARKET_SNAPSHOTS_DB', DEFAULT_DB_PATH))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ---- writes ----
+    def append(self, wallet: str, df: pd.DataFrame, taken_at: Optional[float] = None) -> int:
+        """
+        Record one positions fetch; an empty frame is recorded too, since a
+        wallet going flat is part of its history
+
+        Returns:
+            The new snapshot id
+        """
+        taken_at = time.time() if taken_at is None else float(taken_at)
+        positions = _positions_frame(df)
+        value = positions["currentValue"].sum()
+        pnl = positions["cashPnl"].sum()
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO snapshots (wallet, taken_at, last_seen_at, position_count, total_value, total_pnl, fingerprint)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (wallet.lower(), taken_at, taken_at, len(positions), float(value), float(pnl), _fingerprint(positions))
+            )
+            snapshot_id = cursor.lastrowid
+
+            columns = ["snapshot_id", "asset"] + VALUE_COLUMNS
+            quoted = ", ".join(f'"{c}"' for c in columns)
+            conn.executemany(
+                f"INSERT INTO snapshot_positions ({quoted}) VALUES ({', '.join('?' * len(columns))})",
+                [
+                    [snapshot_id] + [_sql_value(v) for v in row]
+                    for row in positions.itertuples(index=False, name=None)
+                ]
+            )
+
+            if not df.empty and "asset" in df.columns:
+                assets = df.drop_duplicates("asset", keep="last")
+                names = list(ASSET_COLUMNS)
+                conn.executemany(
+                    f"""
+                    INSERT OR REPLACE INTO assets (asset, {', '.join(f'"{c}"' for c in names)}, updated_at)
+                    VALUES ({', '.join('?' * (len(names) + 2))})
+                    """,
+                    [
+                        [str(asset)] + [_sql_value(row.get(c)) for c in names] + [taken_at]
+                        for asset, row in zip(assets["asset"], assets.to_dict("records"))
+                        if isinstance(asset, str) and asset
+                    ]
+                )
+        return snapshot_id
+
+    # ---- reads ----
+    def _where(self, wallet: str, start: Optional[float], end: Optional[float]) -> Tuple[str, List[Any]]:
+        where = "s.wallet = ?"
+        params: List[Any] = [wallet.lower()]
+        if start is not None:
+            where += " AND s.taken_at >= ?"
+            params.append(float(start))
+        if end is not None:
+            where += " AND s.taken_at <= ?"
+            params.append(float(end))
+        return where, params
+
+    def totals(self, wallet: str, start: Optional[float] = None, end: Optional[float] = None) -> pd.DataFrame:
+        """Position count, total value and PnL per snapshot, in time order"""
+        where, params = self._where(wallet, start, end)
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                f"""
+                SELECT s.snapshot_id, s.taken_at, s.last_seen_at, s.position_count, s.total_value, s.total_pnl
+                FROM snapshots s WHERE {where} ORDER BY s.taken_at
+                """,
+                conn, params=params
+            )
+
+    def load(self, wallet: str, start: Optional[float] = None, end: Optional[float] = None) -> pd.DataFrame:
+        """Every position of every snapshot of a wallet within [start, end] unix seconds"""
+        where, params = self._where(wallet, start, end)
+        value_cols = ", ".join(f'p."{c}"' for c in VALUE_COLUMNS)
+        asset_cols = ", ".join(f'a."{c}"' for c in ASSET_COLUMNS)
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                f"""
+                SELECT s.snapshot_id, s.taken_at, p.asset, {value_cols}, {asset_cols}
+                FROM snapshots s
+                JOIN snapshot_positions p ON p.snapshot_id = s.snapshot_id
+                LEFT JOIN assets a ON a.asset = p.asset
+                WHERE {where}
+                ORDER BY s.taken_at, p.asset
+                """,
+                conn, params=params
+            )
+
+    def snapshot(self, snapshot_id: int) -> Optional[pd.DataFrame]:
+        """Positions of one snapshot with their asset metadata, or None if it no longer exists"""
+        value_cols = ", ".join(f'p."{c}"' for c in VALUE_COLUMNS)
+        asset_cols = ", ".join(f'a."{c}"' for c in ASSET_COLUMNS)
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM snapshots WHERE snapshot_id = ?", (int(snapshot_id),)).fetchone() is None:
+                return None
+            return pd.read_sql_query(
+                f"""
+                SELECT p.asset, {value_cols}, {asset_cols}
+                FROM snapshot_positions p LEFT JOIN assets a ON a.asset = p.asset
+                WHERE p.snapshot_id = ? ORDER BY p.asset
+                """,
+                conn, params=[int(snapshot_id)]
+            )
+
+    def latest(
+        self,
+        wallet: str,
+        before: Optional[float] = None,
+        before_id: Optional[int] = None
+    ) -> Optional[Tuple[float, pd.DataFrame]]:
+        """
+        The most recent snapshot as (taken_at, positions), optionally only
+        among those taken before a time or recorded before a snapshot id
+        """
+        query = "SELECT snapshot_id, taken_at FROM snapshots WHERE wallet = ?"
+        params: List[Any] = [wallet.lower()]
+        if before is not None:
+            query += " AND taken_at < ?"
+            params.append(float(before))
+        if before_id is not None:
+            query += " AND snapshot_id < ?"
+            params.append(int(before_id))
+        with self._connect() as conn:
+            row = conn.execute(query + " ORDER BY taken_at DESC, snapshot_id DESC LIMIT 1", params).fetchone()
+        if row is None:
+            return None
+        positions = self.snapshot(row[0])
+        return (row[1], positions) if positions is not None else None
+
+    # ---- compaction ----
+    def compact(
+        self,
+        wallet: Optional[str] = None,
+        keep_all_for: float = 7 * 86400,
+        bucket: float = 3600,
+        vacuum: bool = False
+    ) -> Dict[str, int]:
+        """
+        Merge redundant snapshots
+
+        Runs of consecutive snapshots with identical positions are merged into
+        the first one, whose `last_seen_at` is extended to the end of the run.
+        Snapshots older than `keep_all_for` seconds are thinned to the last
+        one in each `bucket`-second window.
+
+        Returns:
+            Counts of snapshots merged and thinned
+        """
+        query = "SELECT snapshot_id, wallet, taken_at, last_seen_at, fingerprint FROM snapshots"
+        params: List[Any] = []
+        if wallet is not None:
+            query += " WHERE wallet = ?"
+            params.append(wallet.lower())
+        with self._connect() as conn:
+            meta = pd.read_sql_query(query + " ORDER BY wallet, taken_at", conn, params=params)
+        if meta.empty:
+            return {"merged": 0, "thinned": 0}
+
+        # Consecutive identical fingerprints within a wallet form one run
+        new_run = (meta["fingerprint"] != meta["fingerprint"].shift()) | (meta["wallet"] != meta["wallet"].shift())
+        meta["run"] = new_run.cumsum()
+        run_end = meta.groupby("run")["last_seen_at"].transform("max")
+        merged = meta[~new_run]
+        kept = meta[new_run].assign(last_seen_at=run_end[new_run])
+
+        cutoff = time.time() - keep_all_for
+        old = kept[kept["taken_at"] < cutoff]
+        window = (old["taken_at"] // bucket).astype(np.int64)
+        last_in_window = old.groupby([old["wallet"], window])["taken_at"].transform("max")
+        thinned = old[old["taken_at"] != last_in_window]
+
+        drop = np.concatenate([merged["snapshot_id"].to_numpy(), thinned["snapshot_id"].to_numpy()])
+        extended = kept[kept["last_seen_at"] != meta.loc[kept.index, "last_seen_at"]]
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE snapshots SET last_seen_at = ? WHERE snapshot_id = ?",
+                [(float(t), int(i)) for t, i in zip(extended["last_seen_at"], extended["snapshot_id"])]
+            )
+            ids = [(int(i),) for i in drop]
+            conn.executemany("DELETE FROM snapshot_positions WHERE snapshot_id = ?", ids)
+            conn.executemany("DELETE FROM snapshots WHERE snapshot_id = ?", ids)
+        with self._connect() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            if vacuum:
+                conn.execute("VACUUM")
+
+        logger.info(f"Snapshot compaction: {len(merged)} merged, {len(thinned)} thinned")
+        return {"merged": len(merged), "thinned": len(thinned)}
+
+
+_store: Optional[SnapshotStore] = None
+
+
+def record_snapshot(wallet: str, df: pd.DataFrame) -> Optional[int]:
+    """
+    Append a snapshot to the default store unless POLYMARKET_SNAPSHOTS=false;
+    failures are logged and never break the fetch that produced the frame
+    """
+    global _store
+    if os.getenv('POLYMARKET_SNAPSHOTS', 'True').lower() != 'true':
+        return None
+    try:
+        if _store is None:
+            _store = SnapshotStore()
+        return _store.append(wallet, df)
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Could not record snapshot for {wallet}: {str(e)}")
+        return None
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    store = SnapshotStore()
+    if sys.argv[1:2] == ["compact"]:
+        print(store.compact(vacuum="--vacuum" in sys.argv))
+    else:
+        for address in sys.argv[1:] or ["0x22633134dc34f6c9a3bff51a0926c9d209714e26"]:
+            print(store.totals(address).tail(20).to_string(index=False))
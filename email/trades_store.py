@@ -0,0 +1,211 @@
+"""
+Trades History Store
+Incremental sync of wallet trades from the data-api into a local SQLite store
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+
+import pandas as pd
+
+from polymarket_client import fetch_trades
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = ".polymarket_cache/trades.sqlite"
+
+# Columns kept from each /trades record, with their SQLite types
+TRADE_COLUMNS = {
+    "proxyWallet": "TEXT",
+    "side": "TEXT",
+    "asset": "TEXT",
+    "conditionId": "TEXT",
+    "size": "REAL",
+    "price": "REAL",
+    "timestamp": "INTEGER",
+    "title": "TEXT",
+    "slug": "TEXT",
+    "icon": "TEXT",
+    "eventSlug": "TEXT",
+    "outcome": "TEXT",
+    "outcomeIndex": "INTEGER",
+    "transactionHash": "TEXT",
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id TEXT PRIMARY KEY,
+    wallet TEXT NOT NULL,
+    {", ".join(f'"{name}" {kind}' for name, kind in TRADE_COLUMNS.items())}
+);
+CREATE INDEX IF NOT EXISTS idx_trades_wallet_ts ON trades (wallet, "timestamp");
+CREATE INDEX IF NOT EXISTS idx_trades_asset ON trades (asset);
+CREATE TABLE IF NOT EXISTS sync_cursors (
+    wallet TEXT NOT NULL,
+    taker_only INTEGER NOT NULL,
+    last_timestamp INTEGER,
+    last_tx_hash TEXT,
+    backfilled INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL,
+    PRIMARY KEY (wallet, taker_only)
+);
+"""
+
+
+def trade_id(trade: Dict[str, Any]) -> str:
+    """
+    Stable id for a trade
+
+    The data-api has no trade id and one transaction can fill several orders,
+    so the id hashes the transaction together with the fill's own fields.
+    """
+    parts = [str(trade.get(k, "")) for k in ("transactionHash", "asset", "side", "size", "price", "timestamp")]
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()
+
+
+class TradesStore:
+    """Local trades history with a per-wallet sync cursor"""
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = Path(db_path or os.getenv('POLYMARKET_TRADES_DB', DEFAULT_DB_PATH))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_cursor(self, wallet: str, taker_only: bool = True) -> Optional[Dict[str, Any]]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT last_timestamp, last_tx_hash, backfilled FROM sync_cursors WHERE wallet = ? AND taker_only = ?",
+                (wallet.lower(), int(taker_only))
+            ).fetchone()
+        if row is None:
+            return None
+        return {"last_timestamp": row[0], "last_tx_hash": row[1], "backfilled": bool(row[2])}
+
+    def insert(self, wallet: str, trades: Iterable[Dict[str, Any]]) -> int:
+        """Insert trades, ignoring ones already stored; returns the number added"""
+        columns = ["trade_id", "wallet"] + list(TRADE_COLUMNS)
+        rows = [
+            [trade_id(t), wallet.lower()] + [t.get(name) for name in TRADE_COLUMNS]
+            for t in trades
+        ]
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" * len(columns))
+        quoted = ", ".join(f'"{c}"' for c in columns)
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(f"INSERT OR IGNORE INTO trades ({quoted}) VALUES ({placeholders})", rows)
+            return conn.total_changes - before
+
+    def _save_cursor(self, wallet: str, taker_only: bool, newest: Optional[Dict[str, Any]], backfilled: bool) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO sync_cursors (wallet, taker_only, last_timestamp, last_tx_hash, backfilled, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (wallet, taker_only) DO UPDATE SET
+                    last_timestamp = COALESCE(excluded.last_timestamp, last_timestamp),
+                    last_tx_hash = COALESCE(excluded.last_tx_hash, last_tx_hash),
+                    backfilled = MAX(backfilled, excluded.backfilled),
+                    updated_at = excluded.updated_at
+                """,
+                (
+                    wallet.lower(),
+                    int(taker_only),
+                    newest.get("timestamp") if newest else None,
+                    newest.get("transactionHash") if newest else None,
+                    int(backfilled),
+                    time.time(),
+                )
+            )
+
+    def sync(
+        self,
+        wallet: str,
+        taker_only: bool = True,
+        page_size: int = 500,
+        incremental_page_size: int = 100,
+        max_offset: int = 100_000
+    ) -> int:
+        """
+        Fetch trades newer than the wallet's cursor and store them
+
+        The first sync backfills the whole history. Later syncs start with one
+        small page and only keep paging while every trade on it is newer than
+        the cursor, so an up-to-date wallet costs a single request.
+
+        Returns:
+            Number of new trades stored
+        """
+        cursor = self.get_cursor(wallet, taker_only)
+        since = cursor["last_timestamp"] if cursor and cursor["backfilled"] else None
+
+        collected: List[Dict[str, Any]] = []
+        offset = 0
+        limit = incremental_page_size if since is not None else page_size
+        while offset <= max_offset:
+            page = fetch_trades(wallet, limit=limit, offset=offset, taker_only=taker_only, use_cache=False)
+            collected.extend(page)
+            # Trades come back newest first: stop at the first page reaching the cursor
+            if since is not None and any(int(t.get("timestamp", 0)) < since for t in page):
+                break
+            if len(page) < limit:
+                break
+            offset += limit
+            limit = page_size
+
+        if since is not None:
+            # Trades sharing the cursor's timestamp are deduped by trade_id on insert
+            collected = [t for t in collected if int(t.get("timestamp", 0)) >= since]
+
+        added = self.insert(wallet, collected)
+        newest = max(collected, key=lambda t: int(t.get("timestamp", 0)), default=None)
+        self._save_cursor(wallet, taker_only, newest, backfilled=True)
+        logger.info(f"Synced {wallet}: {added} new trades ({len(collected)} fetched)")
+        return added
+
+    def load(
+        self,
+        wallet: str,
+        start: Optional[int] = None,
+        end: Optional[int] = None
+    ) -> pd.DataFrame:
+        """Load a wallet's stored trades in chronological order, optionally within [start, end] unix seconds"""
+        query = "SELECT * FROM trades WHERE wallet = ?"
+        params: List[Any] = [wallet.lower()]
+        if start is not None:
+            query += ' AND "timestamp" >= ?'
+            params.append(int(start))
+        if end is not None:
+            query += ' AND "timestamp" <= ?'
+            params.append(int(end))
+        query += ' ORDER BY "timestamp", trade_id'
+        with self._connect() as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    store = TradesStore()
+    for address in sys.argv[1:] or ["0x22633134dc34f6c9a3bff51a0926c9d209714e26"]:
+        added = store.sync(address)
+        print(f"{address}: {added} new trades, {len(store.load(address))} stored")
@@ -1,15 +1,12 @@
-import time
-import requests
+import sys
+from pathlib import Path
 
-# Central Limit Order Book API
-CLOB = "https://clob.polymarket.com"
+# Add email directory to path
+sys.path.append(str(Path(__file__).parent / 'email'))
 
-# Data API
-DATA = "https://data-api.polymarket.com"
-HEADERS = {"User-Agent": "polymarket-scraper/1.0"}
+from markets_store import MarketsStore
 
 
-# Get list of markets (active questions)
-resp = requests.get("https://clob.polymarket.com/markets?limit=2")
-markets = resp.json()
-print(markets["data"][0])
\ No newline at end of file
+# Sync the full CLOB markets catalog (only new or changed markets are written)
+store = MarketsStore()
+print(store.sync())
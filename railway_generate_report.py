@@ -10,8 +10,8 @@ from pathlib import Path
 # Add email directory to path
 sys.path.append(str(Path(__file__).parent / 'email'))
 
-from create_html import get_user_positions, df_to_pretty_html_marketstyle
-import pandas as pd
+from create_html import create_reports, report_path_for
+from batch_fetch import load_addresses
 
 def main():
     print("=" * 60)
@@ -22,42 +22,39 @@ def main():
     print("To send emails, upgrade to Railway paid tier or run locally.")
     print("=" * 60)
 
-    # Default address (can be overridden by environment variable)
-    address = os.getenv('POLYMARKET_ADDRESS', '0x22633134dc34f6c9a3bff51a0926c9d209714e26')
+    # Default address (can be overridden by POLYMARKET_ADDRESS or POLYMARKET_ADDRESSES)
+    addresses = load_addresses()
 
     # Allow command line override
     if len(sys.argv) > 1:
-        address = sys.argv[1]
+        addresses = list(dict.fromkeys(sys.argv[1:]))
 
-    print(f"\nGenerating report for address: {address}")
+    concurrency = int(os.getenv('FETCH_CONCURRENCY', '8'))
+    workers = int(os.getenv('RENDER_WORKERS', '0')) or None
+    multiple = len(addresses) > 1
 
-    try:
-        # Get positions data
-        df = get_user_positions(address)
-
-        # Ensure df['title'] is present
-        if 'title' not in df.columns and 'marketQuestion' in df.columns:
-            df['title'] = df['marketQuestion']
-
-        # Log filtering info
-        original_count = len(df)
-        if 'currentValue' in df.columns:
-            df_temp = df.copy()
-            df_temp['currentValue'] = pd.to_numeric(df_temp['currentValue'], errors="coerce")
-            filtered_count = len(df_temp[df_temp['currentValue'] > 0])
-            if filtered_count < original_count:
-                print(f"Filtering: {original_count} positions → {filtered_count} positions (removed {original_count - filtered_count} with zero value)")
+    print(f"\nGenerating report for {len(addresses)} address(es): {', '.join(addresses)}")
 
-        # Generate HTML
-        output_path = df_to_pretty_html_marketstyle(df, out_path="polymarket_positions.html")
-        print(f"✅ HTML report saved to: {output_path}")
+    try:
+        # Fetch asynchronously, render across a process pool
+        results = create_reports(
+            addresses,
+            workers=workers,
+            concurrency=concurrency,
+            html_path_for=lambda address: report_path_for(address, multiple),
+            skip_unchanged=os.getenv('SKIP_UNCHANGED', 'False').lower() == 'true'
+        )
+        failures = sum(1 for out in results.values() if isinstance(out, Exception))
 
         # Provide instructions for accessing the report
         print("\n" + "=" * 60)
-        print("Report Generated Successfully!")
+        if failures:
+            print(f"Reports Generated with {failures} failure(s)")
+        else:
+            print("Report Generated Successfully!")
         print("=" * 60)
         print("\nTo view the report:")
-        print("1. Download the file: polymarket_positions.html")
+        print("1. Download the generated polymarket_positions*.html file(s)")
         print("2. Open it in your web browser")
         print("\nTo send via email:")
         print("- Option 1: Upgrade to Railway paid tier (Team plan or higher)")
@@ -65,6 +62,9 @@ def main():
         print("- Option 3: Use an email API service (SendGrid, Mailgun, etc.)")
         print("=" * 60)
 
+        if failures == len(addresses):
+            sys.exit(1)
+
     except Exception as e:
         print(f"\n❌ Error generating report: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Resident report scheduler
+Keeps one warm process running per-wallet report jobs on their own intervals,
+instead of paying interpreter start-up and imports for every one-shot run
+"""
+import heapq
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add email directory to path
+sys.path.append(str(Path(__file__).parent / 'email'))
+
+from batch_fetch import load_addresses
+from create_html import create_and_send_report, get_user_positions, report_path_for
+from polymarket_client import POSITIONS_PAGE_WORKERS, get_session
+from position_diff import DiffThresholds, check_wallet
+
+
+DEFAULT_INTERVAL = 3600.0
+
+
+def parse_intervals(value: Optional[str]) -> Dict[str, float]:
+    """Parse per-wallet overrides given as `address=seconds,address=seconds`"""
+    intervals = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            address, seconds = item.split("=", 1)
+            intervals[address.strip().lower()] = float(seconds)
+    return intervals
+
+
+class WalletScheduler:
+    """
+    Runs one job per wallet on a fixed interval with random jitter
+
+    First runs are staggered evenly across `stagger` seconds so wallets do not
+    all hit the API at once. Jobs run on a thread pool and the scheduling loop
+    never waits on them: a wallet whose previous run is still going skips that
+    tick instead of delaying anyone else. Since a wallet never has more than
+    one job in flight, one worker per wallet means a slow or hung wallet can
+    never hold up another one's run.
+    """
+
+    def __init__(
+        self,
+        addresses: List[str],
+        job: Callable[[str], object],
+        interval: float = DEFAULT_INTERVAL,
+        intervals: Optional[Dict[str, float]] = None,
+        jitter: float = 0.1,
+        stagger: Optional[float] = None,
+        workers: Optional[int] = None
+    ):
+        self.addresses = list(dict.fromkeys(addresses))
+        self.job = job
+        self.interval = interval
+        self.intervals = {k.lower(): v for k, v in (intervals or {}).items()}
+        self.jitter = jitter
+        self.stagger = min(interval, 60.0) if stagger is None else stagger
+        self.workers = workers or len(self.addresses) or 1
+
+        self._stop = threading.Event()
+        self._running: Dict[str, Future] = {}
+        self._due: List[Tuple[float, str]] = []
+
+    def interval_for(self, address: str) -> float:
+        return self.intervals.get(address.lower(), self.interval)
+
+    def _next_run(self, due: float, address: str) -> float:
+        interval = self.interval_for(address)
+        return due + interval * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _run_job(self, address: str) -> None:
+        started = time.monotonic()
+        try:
+            self.job(address)
+            print(f"[scheduler] {address} done in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            print(f"[scheduler] {address} failed after {time.monotonic() - started:.1f}s: {str(e)}")
+
+    def stop(self, *_) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        """Schedule jobs until `stop` is called (also wired to SIGTERM/SIGINT by `main`)"""
+        now = time.monotonic()
+        step = self.stagger / len(self.addresses) if self.addresses else 0
+        self._due = [(now + i * step, address) for i, address in enumerate(self.addresses)]
+        heapq.heapify(self._due)
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report") as pool:
+            while self._due and not self._stop.is_set():
+                due, address = self._due[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._stop.wait(wait)
+                    continue
+                heapq.heappop(self._due)
+
+                running = self._running.get(address)
+                if running is not None and not running.done():
+                    print(f"[scheduler] {address} is still running; skipping this run")
+                else:
+                    self._running[address] = pool.submit(self._run_job, address)
+
+                # Schedule from the due time, not the finish time, so runs do not drift
+                next_due = self._next_run(due, address)
+                heapq.heappush(self._due, (max(next_due, time.monotonic()), address))
+
+            print("[scheduler] stopping; waiting for running jobs")
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def report_job(addresses: List[str], digest=None, sender=None) -> Callable[[str], object]:
+    """
+    Fetch, render and optionally email one wallet's report, or with
+    REPORT_MODE=delta only email the changes since the last delta (through
+    `digest` when one is given). Every job mails through the one `sender`.
+    """
+    multiple = len(addresses) > 1
+    recipients = [r.strip() for r in os.getenv('REPORT_EMAIL_TO', '').split(",") if r.strip()]
+    recipient = recipients if len(recipients) > 1 else (recipients[0] if recipients else None)
+    skip_unchanged = os.getenv('SKIP_UNCHANGED', 'True').lower() == 'true'
+
+    if os.getenv('REPORT_MODE', 'full').lower() == 'delta':
+        thresholds = DiffThresholds.from_env()
+        return lambda address: check_wallet(address, recipient, thresholds, digest=digest, sender=sender)
+
+    def job(address: str):
+        return create_and_send_report(
+            address=address,
+            recipient_email=recipient,
+            send_email=bool(recipients),
+            html_path=report_path_for(address, multiple),
+            df=get_user_positions(address),
+            skip_unchanged=skip_unchanged,
+            sender=sender
+        )
+
+    return job
+
+
+def main():
+    addresses = load_addresses()
+    if len(sys.argv) > 1:
+        addresses = list(dict.fromkeys(sys.argv[1:]))
+
+    interval = float(os.getenv('REPORT_INTERVAL', str(DEFAULT_INTERVAL)))
+    stagger = os.getenv('SCHEDULE_STAGGER')
+    # One pooled sender for the life of the process, closed on exit. Jobs hand
+    # their emails to the durable outbox (MAIL_QUEUE=false to send inline), so
+    # report generation never waits on SMTP
+    sender = None
+    queue = None
+    if os.getenv('REPORT_EMAIL_TO', '').strip():
+        from gmail_sender import GmailSender
+        sender = GmailSender()
+        if os.getenv('MAIL_QUEUE', 'true').lower() == 'true':
+            from mail_queue import MailQueue
+            sender = queue = MailQueue(sender)
+    digest = None
+    if os.getenv('REPORT_MODE', 'full').lower() == 'delta' and float(os.getenv('DIGEST_WINDOW', '0')) > 0:
+        # Coalesce per-wallet deltas into rate-capped digests
+        from mail_digest import DigestMailer
+        digest = DigestMailer(sender)
+    scheduler = WalletScheduler(
+        addresses,
+        report_job(addresses, digest, sender),
+        interval=interval,
+        intervals=parse_intervals(os.getenv('REPORT_INTERVALS')),
+        jitter=float(os.getenv('SCHEDULE_JITTER', '0.1')),
+        stagger=float(stagger) if stagger else None,
+        workers=int(os.getenv('SCHEDULER_WORKERS', '0')) or None
+    )
+
+    # Every worker may page one wallet's positions with several threads
+    get_session(pool_size=scheduler.workers * POSITIONS_PAGE_WORKERS)
+
+    signal.signal(signal.SIGTERM, scheduler.stop)
+    signal.signal(signal.SIGINT, scheduler.stop)
+
+    print("=" * 60)
+    print(f"Polymarket report scheduler: {len(addresses)} wallet(s)")
+    for address in scheduler.addresses:
+        print(f"  {address} every {scheduler.interval_for(address):.0f}s")
+    if digest is not None:
+        print(f"  changes coalesced into digests every {digest.config.window:.0f}s")
+    if queue is not None:
+        print(f"  emails sent from the outbox in {queue.pending_dir.parent}")
+    print("=" * 60)
+    try:
+        scheduler.run()
+    finally:
+        if digest is not None:
+            digest.close()
+        if queue is not None:
+            # Whatever is still undelivered stays in the outbox for the next start
+            queue.close(timeout=float(os.getenv('MAIL_QUEUE_DRAIN_TIMEOUT', '30')))
+        elif sender is not None:
+            sender.close()
+
+
+if __name__ == "__main__":
+    main()
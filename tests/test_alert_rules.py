@@ -0,0 +1,59 @@
+import runpy
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+EMAIL_DIR = Path(__file__).resolve().parent.parent / "email"
+sys.path.insert(0, str(EMAIL_DIR))
+
+import batch_fetch  # noqa: E402
+from batch_fetch import WalletResult  # noqa: E402
+
+
+def test_cli_evaluates_rules_over_fetched_wallets(monkeypatch, tmp_path, capsys):
+    positions = pd.DataFrame({
+        "asset": ["1", "2"],
+        "title": ["Market A", "Market B"],
+        "outcome": ["Yes", "No"],
+        "curPrice": [0.95, 0.40],
+    })
+
+    def fake_fetch_wallets(addresses, **kwargs):
+        return {
+            "0xaaa": WalletResult("0xaaa", positions=positions),
+            "0xbbb": WalletResult("0xbbb", error=RuntimeError("boom")),
+        }
+
+    monkeypatch.setattr(batch_fetch, "fetch_wallets", fake_fetch_wallets)
+    monkeypatch.setenv("ALERT_RULES", "curPrice > 0.9")
+    monkeypatch.setenv("ALERT_STATE_PATH", str(tmp_path / "alerts.sqlite"))
+    monkeypatch.setattr(sys, "argv", ["alert_rules.py", "0xaaa", "0xbbb"])
+
+    runpy.run_path(str(EMAIL_DIR / "alert_rules.py"), run_name="__main__")
+
+    out = capsys.readouterr().out
+    assert "Market A" in out
+    assert "Market B" not in out
+
+
+def test_state_forgets_closed_positions_and_keeps_other_wallets(tmp_path):
+    from alert_rules import AlertEngine, parse_rule
+
+    state_path = tmp_path / "alerts.sqlite"
+    rules = [parse_rule("curPrice > 0.9")]
+
+    def frame(rows):
+        return pd.DataFrame(rows, columns=["wallet", "asset", "curPrice"])
+
+    engine = AlertEngine(rules, state_path=str(state_path))
+    engine.evaluate(frame([["0xaaa", "1", 0.95], ["0xaaa", "2", 0.5], ["0xbbb", "3", 0.95]]))
+    # Position 1 closed; 0xbbb is monitored in another batch
+    engine.evaluate(frame([["0xaaa", "2", 0.5]]))
+
+    restored = AlertEngine(rules, state_path=str(state_path))
+    assert sorted(restored._last_values.index) == ["0xaaa|2", "0xbbb|3"]
+    assert [key.split("|", 1)[1] for key in restored._active] == ["0xbbb|3"]
+    # Reopening the closed position fires again
+    alerts = restored.evaluate(frame([["0xaaa", "1", 0.95], ["0xaaa", "2", 0.5]]))
+    assert alerts["asset"].tolist() == ["1"]